@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import time
+
+import httpx
+
+
+async def main():
+    parser = argparse.ArgumentParser(
+        description='Requisições por segundo em GET /debt/; rode uma vez '
+        'com DATABASE_ASYNC=false e outra com DATABASE_ASYNC=true'
+    )
+    parser.add_argument('--url', default='http://localhost:8000')
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--password', required=True)
+    parser.add_argument('--clients', type=int, default=500)
+    parser.add_argument('--requests', type=int, default=20)
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(
+        base_url=args.url, limits=limits, timeout=60
+    ) as client:
+        response = await client.post(
+            '/auth/token',
+            data={'username': args.email, 'password': args.password},
+        )
+        headers = {
+            'Authorization': f'Bearer {response.json()["access_token"]}'
+        }
+
+        latencies = []
+        errors = 0
+
+        async def worker():
+            nonlocal errors
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                try:
+                    response = await client.get('/debt/', headers=headers)
+                    errors += response.is_error
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    print(f'{args.clients} clientes, {total} requisições, {errors} erros')
+    print(f'{total / elapsed:.0f} req/s')
+    print(
+        f'p50 {latencies[total // 2] * 1000:.0f} ms,'
+        f' p99 {latencies[int(total * 0.99)] * 1000:.0f} ms'
+    )
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
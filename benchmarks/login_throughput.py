@@ -0,0 +1,53 @@
+import argparse
+import asyncio
+import os
+import time
+
+from debt_control.utils.password import (
+    HashingPool,
+    get_password_hash,
+    settings,
+    verify_password,
+)
+
+
+async def measure(workers: int, logins: int, hashed: str):
+    pool = HashingPool(workers, queue_size=logins)
+    # sobe os processos antes de medir
+    await asyncio.gather(*[
+        pool.run(verify_password, 'secret', hashed) for _ in range(workers)
+    ])
+
+    start = time.perf_counter()
+    await asyncio.gather(*[
+        pool.run(verify_password, 'secret', hashed) for _ in range(logins)
+    ])
+    elapsed = time.perf_counter() - start
+    pool.shutdown()
+
+    return logins / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=200)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    print(
+        f'argon2 time_cost={settings.ARGON2_TIME_COST}'
+        f' memory_cost={settings.ARGON2_MEMORY_COST}'
+        f' parallelism={settings.ARGON2_PARALLELISM}'
+    )
+    hashed = get_password_hash('secret')
+
+    for workers in range(1, args.max_workers + 1):
+        throughput = asyncio.run(measure(workers, args.logins, hashed))
+        print(
+            f'{workers} workers: {throughput:.1f} logins/s'
+            f' ({throughput / workers:.1f} por worker)'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import time
+
+from debt_control.services.dispatcher import (
+    FakeTransport,
+    Notification,
+    NotificationDispatcher,
+)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05)
+    args = parser.parse_args()
+
+    transport = FakeTransport(latency=args.latency)
+    dispatcher = NotificationDispatcher(transport, workers=args.workers)
+
+    start = time.perf_counter()
+    for n in range(args.messages):
+        dispatcher.submit(Notification(f'token-{n}', 'title', 'body'))
+    enqueued = time.perf_counter() - start
+    dispatcher.stop()
+    elapsed = time.perf_counter() - start
+
+    print(f'enfileiradas em {enqueued:.3f}s')
+    print(
+        f'{len(transport.sent)} mensagens em {len(transport.batches)} lotes,'
+        f' {elapsed:.2f}s ({len(transport.sent) / elapsed:.0f} msg/s)'
+    )
+
+
+if __name__ == '__main__':
+    main()
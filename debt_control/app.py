@@ -1,22 +1,53 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
 from fastapi import FastAPI
 
+from debt_control.database import async_engine, engine, pool_status
 from debt_control.routers import auth, category, debt, users
-from debt_control.schemas import Message
+from debt_control.schemas import DatabaseMetrics, Message
+from debt_control.security import hashing_pool
 from debt_control.services.scheduler import start_scheduler
+from debt_control.services.user_cache import start_invalidation_listener
+from debt_control.settings import Settings
+from debt_control.utils.firebase import dispatcher
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # inicia agendador ao subir o app; só um processo vira líder
+    # e, com cache compartilhado, escuta as invalidações dos outros workers
+    settings = Settings()
+    stoppers = []
+    if not settings.TESTING:
+        stoppers.append(start_scheduler())  # pragma: no cover
+    if settings.USER_CACHE_SHARED:
+        stoppers.append(start_invalidation_listener())  # pragma: no cover
+
+    yield
+
+    for stop in stoppers:
+        stop()  # pragma: no cover
+    dispatcher.stop()
+    hashing_pool.shutdown()
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.include_router(users.router)
 app.include_router(auth.router)
 app.include_router(category.router)
 app.include_router(debt.router)
 
-# inicia agendador ao subir o app
-start_scheduler()  # pragma: no cover
-
 
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
 def read_root():
     return {'message': 'Olá Mundo!'}
+
+
+@app.get('/metrics/database', response_model=DatabaseMetrics)
+def database_metrics():
+    return {
+        'sync': pool_status(engine),
+        'async': pool_status(async_engine) if async_engine else None,
+    }
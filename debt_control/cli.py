@@ -0,0 +1,83 @@
+import argparse
+import time
+
+from sqlalchemy.orm import Session
+
+from debt_control.database import engine
+from debt_control.services.import_service import (
+    import_debts,
+    parse_csv,
+    parse_ofx,
+)
+from debt_control.services.outbox_service import relay_outbox
+from debt_control.services.overdue_service import run_overdue_transition
+from debt_control.services.summary_service import rebuild_summary
+from debt_control.utils.firebase import transport
+
+
+def overdue(args):  # pragma: no cover
+    with Session(engine) as session:
+        count = run_overdue_transition(session)
+    print(f'{count} dívidas com parcelas vencidas')
+
+
+def summary(args):  # pragma: no cover
+    with Session(engine) as session:
+        rebuild_summary(session)
+    print('Resumo mensal reconstruído')
+
+
+def import_file(args):  # pragma: no cover
+    parse = parse_ofx if args.format == 'ofx' else parse_csv
+    with Session(engine) as session, open(args.path, 'rb') as file:
+        summary = import_debts(session, args.user_id, parse(file))
+        session.commit()
+    print(
+        f'{summary["debts"]} dívidas, {summary["installments"]} parcelas'
+        f' e {summary["categories"]} categorias importadas'
+    )
+
+
+def relay(args):  # pragma: no cover
+    # worker dedicado; vários podem rodar juntos graças ao SKIP LOCKED
+    while True:
+        with Session(engine) as session:
+            relayed = relay_outbox(session, transport)
+        if not relayed:
+            time.sleep(args.interval)
+
+
+def main(argv=None):  # pragma: no cover
+    parser = argparse.ArgumentParser(prog='debt_control')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    commands.add_parser(
+        'overdue', help='Atualiza parcelas e dívidas vencidas'
+    ).set_defaults(func=overdue)
+
+    commands.add_parser(
+        'summary', help='Reconstrói o resumo mensal a partir das parcelas'
+    ).set_defaults(func=summary)
+
+    import_parser = commands.add_parser(
+        'import', help='Importa dívidas de um arquivo CSV ou extrato OFX'
+    )
+    import_parser.add_argument('--user-id', type=int, required=True)
+    import_parser.add_argument(
+        '--format', choices=['csv', 'ofx'], default='csv'
+    )
+    import_parser.add_argument('path')
+    import_parser.set_defaults(func=import_file)
+
+    relay_parser = commands.add_parser(
+        'relay', help='Envia as notificações pendentes do outbox'
+    )
+    relay_parser.add_argument('--interval', type=float, default=1.0)
+    relay_parser.set_defaults(func=relay)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':  # pragma: no cover
+    main()
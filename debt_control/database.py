@@ -1,11 +1,229 @@
-from sqlalchemy import create_engine
+import time
+from threading import Lock
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 
 from debt_control.settings import Settings
 
-engine = create_engine(Settings().DATABASE_URL)
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self._lock = Lock()
+
+    def observe(self, wait: float, timed_out: bool = False):
+        with self._lock:
+            self.checkouts += not timed_out
+            self.timeouts += timed_out
+            self.wait_total += wait
+            self.wait_max = max(self.wait_max, wait)
+
+    def snapshot(self):
+        with self._lock:
+            waits = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': (
+                    self.wait_total / waits * 1000 if waits else 0.0
+                ),
+                'wait_max_ms': self.wait_max * 1000,
+            }
+
+
+class _MeteredPool:
+    # mede quanto cada checkout esperou por uma conexão livre
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.observe(time.perf_counter() - start)
+        return connection
+
+
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    pass
+
+
+class MeteredAsyncQueuePool(_MeteredPool, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(settings: Settings, poolclass=MeteredQueuePool):
+    if settings.DATABASE_PGBOUNCER:
+        # quem faz o pool é o PgBouncer; prepared statements não
+        # sobrevivem à troca de conexão no modo transaction, e o timeout
+        # vai por transação (configure_engine)
+        return {
+            'poolclass': NullPool,
+            'connect_args': {'prepare_threshold': None},
+        }
+
+    connect_args = {}
+    if settings.DATABASE_STATEMENT_TIMEOUT:
+        connect_args['options'] = (
+            f'-c statement_timeout={settings.DATABASE_STATEMENT_TIMEOUT}'
+        )
+
+    return {
+        'poolclass': poolclass,
+        'pool_size': settings.DATABASE_POOL_SIZE,
+        'max_overflow': settings.DATABASE_MAX_OVERFLOW,
+        'pool_timeout': settings.DATABASE_POOL_TIMEOUT,
+        'pool_recycle': settings.DATABASE_POOL_RECYCLE,
+        'pool_pre_ping': settings.DATABASE_POOL_PRE_PING,
+        'connect_args': connect_args,
+    }
+
+
+def configure_engine(bind, settings: Settings):
+    # o PgBouncer recusa o parâmetro options na conexão; com ele o
+    # statement_timeout é aplicado no início de cada transação
+    timeout = settings.DATABASE_STATEMENT_TIMEOUT
+    if settings.DATABASE_PGBOUNCER and timeout:
+
+        @event.listens_for(bind, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(
+                f'SET LOCAL statement_timeout = {timeout}'
+            )
+
+    return bind
+
+
+def pool_status(bind):
+    pool = bind.pool
+    status = {'pool': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update({
+            'size': pool.size(),
+            'checked_out': pool.checkedout(),
+            'overflow': pool.overflow(),
+        })
+    if isinstance(pool, _MeteredPool):
+        status.update(pool.metrics.snapshot())
+    return status
+
+
+settings = Settings()
+
+# usado pelo agendador, CLI e serviços que rodam fora do event loop
+engine = configure_engine(
+    create_engine(settings.DATABASE_URL, **engine_options(settings)),
+    settings,
+)
+
+async_engine = (
+    create_async_engine(
+        settings.DATABASE_URL,
+        **engine_options(settings, MeteredAsyncQueuePool),
+    )
+    if settings.DATABASE_ASYNC
+    else None
+)
+if async_engine:
+    configure_engine(async_engine.sync_engine, settings)
+
+# locks de sessão não sobrevivem ao modo transaction do PgBouncer
+direct_engine = (
+    create_engine(settings.direct_url, poolclass=NullPool)
+    if settings.DATABASE_PGBOUNCER
+    else engine
+)
+
+
+class ThreadedResult:
+    # cada lote do cursor do servidor é buscado no threadpool
+    def __init__(self, result):
+        self.result = result
+
+    async def partitions(self, size=None):
+        partitions = self.result.partitions(size)
+        while rows := await run_in_threadpool(next, partitions, None):
+            yield rows
+
+
+class ThreadedSession:
+    # mesma interface do AsyncSession sobre um Session síncrono: cada
+    # chamada roda no threadpool, como acontecia com as rotas síncronas
+    def __init__(self, sync_session: Session):
+        self.sync_session = sync_session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    async def run_sync(self, fn, *args, **kwargs):
+        return await run_in_threadpool(fn, self.sync_session, *args, **kwargs)
+
+    async def execute(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+
+    async def scalar(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalar, *args, **kwargs
+        )
+
+    async def scalars(self, *args, **kwargs):
+        return await run_in_threadpool(
+            self.sync_session.scalars, *args, **kwargs
+        )
+
+    async def stream(self, *args, **kwargs):
+        result = await run_in_threadpool(
+            self.sync_session.execute, *args, **kwargs
+        )
+        return ThreadedResult(result)
+
+    async def get(self, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, *args, **kwargs)
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def refresh(self, instance):
+        await run_in_threadpool(self.sync_session.refresh, instance)
+
+
+async def get_session():  # pragma: no cover
+    if async_engine:
+        async with AsyncSession(
+            async_engine, expire_on_commit=False
+        ) as session:
+            yield session
+    else:
+        # como no AsyncSession: ler atributos depois do commit não pode
+        # disparar um refresh bloqueante no event loop
+        with Session(engine, expire_on_commit=False) as session:
+            yield ThreadedSession(session)
 
 
-def get_session():  # pragma: no cover
+def get_sync_session():  # pragma: no cover
+    # para rotas longas e síncronas, que o FastAPI roda no threadpool
     with Session(engine) as session:
         yield session
@@ -1,12 +1,50 @@
 from datetime import date, datetime
+from decimal import Decimal
 from enum import Enum
 from typing import List, Optional
 
-from sqlalchemy import ForeignKey, exists, func, update
+from sqlalchemy import (
+    ARRAY,
+    DDL,
+    ForeignKey,
+    Index,
+    Integer,
+    Numeric,
+    any_,
+    bindparam,
+    case,
+    cast,
+    event,
+    exists,
+    func,
+    select,
+    text,
+    update,
+)
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+# valores em reais com 2 casas, sem o arredondamento acumulado do float
+MONEY = Numeric(14, 2)
+
+# os índices trigram dependem da extensão; no create_all ela vem antes
+event.listen(
+    table_registry.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'),
+)
+
+
+def trgm_index(name: str, column: str):
+    # GIN com pg_trgm atende ILIKE '%termo%' e similarity()
+    return Index(
+        name,
+        column,
+        postgresql_using='gin',
+        postgresql_ops={column: 'gin_trgm_ops'},
+    )
+
 
 class DebtState(str, Enum):
     pay = 'pay'
@@ -24,6 +62,10 @@ class User:
     password: Mapped[str]
     email: Mapped[str] = mapped_column(unique=True)
     fcm_token: Mapped[str] = mapped_column(nullable=True)
+    # incrementado para revogar os tokens já emitidos
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
@@ -47,6 +89,10 @@ class User:
 @table_registry.mapped_as_dataclass
 class Category:
     __tablename__ = 'category'
+    __table_args__ = (
+        Index('ix_category_user_id', 'user_id'),
+        trgm_index('ix_category_description_trgm', 'description'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     description: Mapped[str]
@@ -70,10 +116,17 @@ class Category:
 @table_registry.mapped_as_dataclass
 class Debt:
     __tablename__ = 'debt'
+    __table_args__ = (
+        Index('ix_debt_user_id_purchasedate', 'user_id', 'purchasedate', 'id'),
+        Index('ix_debt_category_id', 'category_id'),
+        Index('ix_debt_created_at', 'created_at'),
+        trgm_index('ix_debt_description_trgm', 'description'),
+        trgm_index('ix_debt_note_trgm', 'note'),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     description: Mapped[str]
-    value: Mapped[float]
+    value: Mapped[Decimal] = mapped_column(MONEY)
     plots: Mapped[str]
     purchasedate: Mapped[date]
     state: Mapped[DebtState]
@@ -100,32 +153,85 @@ class Debt:
     )
 
     @classmethod
-    def update_overdue_debts(cls, session):
-        stmt = (
+    def update_overdue_debts(cls, session, debt_ids, since=None):
+        stmt = update(cls).where(
+            cls.state == DebtState.pending,
+            exists().where(
+                (DebtInstallment.debt_id == cls.id)
+                & (DebtInstallment.state == DebtState.overdue)
+            ),
+        )
+
+        # dívidas criadas com data retroativa desde a última execução
+        if since:
+            stmt = stmt.where(cls.id.in_(debt_ids) | (cls.created_at >= since))
+
+        result = session.execute(
+            stmt.values(state=DebtState.overdue).execution_options(
+                synchronize_session=False
+            )
+        )
+        return result.rowcount
+
+    @classmethod
+    def update_paid_debts(cls, session, user_id, debt_ids):
+        # chamar depois de pagar as parcelas, na mesma transação; uma
+        # parcela vencida em aberto mantém a dívida vencida. Agrega só as
+        # parcelas dessas dívidas, pelo índice de debt_id
+        def has_installment(state):
+            return func.bool_or(DebtInstallment.state == state)
+
+        installments = (
+            select(
+                DebtInstallment.debt_id,
+                has_installment(DebtState.overdue).label('overdue'),
+                has_installment(DebtState.pending).label('pending'),
+            )
+            .where(DebtInstallment.debt_id.in_(debt_ids))
+            .group_by(DebtInstallment.debt_id)
+            .subquery()
+        )
+        result = session.execute(
             update(cls)
-            .where(
-                exists().where(
-                    (DebtInstallment.debt_id == cls.id)
-                    & (DebtInstallment.state == 'overdue')
+            .where(cls.user_id == user_id, cls.id == installments.c.debt_id)
+            .values(
+                state=case(
+                    (
+                        installments.c.overdue,
+                        cast(DebtState.overdue, cls.state.type),
+                    ),
+                    (
+                        installments.c.pending,
+                        cast(DebtState.pending, cls.state.type),
+                    ),
+                    else_=cast(DebtState.pay, cls.state.type),
                 )
             )
-            .values(state='overdue')
+            .returning(cls.id, cls.description)
+            .execution_options(synchronize_session=False)
         )
-        result = session.execute(stmt)
-        session.commit()
-        return result.rowcount
+        return dict(result.all())
 
 
 @table_registry.mapped_as_dataclass
 class DebtInstallment:
     __tablename__ = 'debt_installment'
+    __table_args__ = (
+        Index('ix_debt_installment_debt_id_duedate', 'debt_id', 'duedate'),
+        Index('ix_debt_installment_user_id_duedate', 'user_id', 'duedate'),
+        Index(
+            'ix_debt_installment_pending_duedate',
+            'duedate',
+            postgresql_where=text("state = 'pending'"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     debt_id: Mapped[int] = mapped_column(ForeignKey('debt.id'))
-    installmentamount: Mapped[float]
+    installmentamount: Mapped[Decimal] = mapped_column(MONEY)
     number: Mapped[int]
     duedate: Mapped[date]
-    amount: Mapped[float] = mapped_column(nullable=True)
+    amount: Mapped[Decimal] = mapped_column(MONEY, nullable=True)
     paid_date: Mapped[Optional[date]] = mapped_column(nullable=True)
     state: Mapped[DebtState]
 
@@ -146,14 +252,100 @@ class DebtInstallment:
     )
 
     @classmethod
-    def update_overdue(cls, session):
-        today = date.today()
-        stmt = (
+    def update_overdue(cls, session, today, since=None):
+        stmt = update(cls).where(
+            cls.state == DebtState.pending, cls.duedate < today
+        )
+
+        # só as parcelas que venceram desde a última execução
+        if since:
+            stmt = stmt.where(cls.duedate >= since)
+
+        result = session.execute(
+            stmt.values(state=DebtState.overdue)
+            .returning(
+                cls.debt_id, cls.user_id, cls.duedate, cls.installmentamount
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.all()
+
+    @classmethod
+    def pay(cls, session, user_id, ids, amount, *criteria):
+        # trava as parcelas a pagar para devolver o estado anterior delas
+        # no RETURNING, que só enxerga os valores novos
+        payable = select(cls.id, cls.state).where(
+            cls.user_id == user_id,
+            cls.state.in_([DebtState.pending, DebtState.overdue]),
+            *criteria,
+        )
+        if ids is not None:
+            payable = payable.where(
+                cls.id == any_(bindparam('ids', ids, type_=ARRAY(Integer)))
+            )
+        payable = payable.with_for_update().cte('payable')
+
+        result = session.execute(
             update(cls)
-            .where(cls.state == 'pending', cls.duedate < today)
-            .values(state='overdue')
-            .execution_options(synchronize_session='fetch')
+            .where(cls.id == payable.c.id)
+            .values(
+                state=DebtState.pay,
+                paid_date=func.current_date(),
+                amount=cls.installmentamount if amount else amount,
+            )
+            .returning(
+                cls.id,
+                cls.debt_id,
+                cls.number,
+                cls.duedate,
+                cls.installmentamount,
+                payable.c.state.label('previous_state'),
+            )
+            .execution_options(synchronize_session=False)
         )
-        result = session.execute(stmt)
-        session.commit()
-        return result.rowcount
+        return sorted(result.all(), key=lambda row: (row.debt_id, row.number))
+
+
+# totais de parcelas por usuário, mês de vencimento e estado, mantidos
+# incrementalmente a cada escrita em debt_installment
+@table_registry.mapped_as_dataclass
+class UserMonthlySummary:
+    __tablename__ = 'user_monthly_summary'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    month: Mapped[date] = mapped_column(primary_key=True)
+    state: Mapped[DebtState] = mapped_column(primary_key=True)
+    count: Mapped[int]
+    total: Mapped[Decimal] = mapped_column(MONEY)
+
+
+@table_registry.mapped_as_dataclass
+class JobWatermark:
+    __tablename__ = 'job_watermark'
+
+    name: Mapped[str] = mapped_column(primary_key=True)
+    last_run: Mapped[date]
+
+    updated_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), onupdate=func.now()
+    )
+
+
+@table_registry.mapped_as_dataclass
+class NotificationOutbox:
+    __tablename__ = 'notification_outbox'
+
+    id: Mapped[int] = mapped_column(init=False, primary_key=True)
+    token: Mapped[str]
+    title: Mapped[str]
+    body: Mapped[str]
+    attempts: Mapped[int] = mapped_column(init=False, default=0)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now(), index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        init=False, server_default=func.now()
+    )
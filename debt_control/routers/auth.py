@@ -4,26 +4,28 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from debt_control.database import get_session
 from debt_control.models import User
-from debt_control.schemas import Token
+from debt_control.schemas import AuthenticatedUser, Token
 from debt_control.security import (
-    create_access_token,
+    check_and_update_password,
+    create_user_token,
     get_current_user,
-    verify_password,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
-T_Session = Annotated[Session, Depends(get_session)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
 
 
 @router.post('/token', response_model=Token)
-def login_for_access_token(form_data: OAuth2Form, session: T_Session):
-    user = session.scalar(select(User).where(User.email == form_data.username))
+async def login_for_access_token(form_data: OAuth2Form, session: T_Session):
+    user = await session.scalar(
+        select(User).where(User.email == form_data.username)
+    )
 
     if not user:
         raise HTTPException(
@@ -31,13 +33,22 @@ def login_for_access_token(form_data: OAuth2Form, session: T_Session):
             detail='Incorrect email or password',
         )
 
-    if not verify_password(form_data.password, user.password):
+    valid, updated_hash = await check_and_update_password(
+        form_data.password, user.password
+    )
+
+    if not valid:
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect email or password',
         )
 
-    access_token = create_access_token(data={'sub': user.email})
+    # hash gerado com parâmetros antigos do Argon2: regrava com os atuais
+    if updated_hash:
+        user.password = updated_hash
+        await session.commit()
+
+    access_token = create_user_token(user)
 
     return {
         'access_token': access_token,
@@ -47,10 +58,10 @@ def login_for_access_token(form_data: OAuth2Form, session: T_Session):
 
 
 @router.post('/refresh_token', response_model=Token)
-def refresh_access_token(
-    user: User = Depends(get_current_user),
+async def refresh_access_token(
+    user: AuthenticatedUser = Depends(get_current_user),
 ):
-    new_access_token = create_access_token(data={'sub': user.email})
+    new_access_token = create_user_token(user)
 
     return {
         'access_token': new_access_token,
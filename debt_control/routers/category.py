@@ -2,30 +2,40 @@ from http import HTTPStatus
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from debt_control.database import get_session
-from debt_control.models import Category, User
+from debt_control.models import Category, Debt, DebtInstallment, DebtState
 from debt_control.schemas import (
     CategoryPublic,
     CategorySchema,
+    CategorySummary,
+    CategorySummaryList,
     FilterCategory,
+    FilterDashboard,
     ListCategories,
     Message,
+    Principal,
+)
+from debt_control.security import get_current_principal
+from debt_control.services.summary_service import remove_installments
+from debt_control.utils.search import (
+    exact_match,
+    search_filter,
+    similarity_rank,
 )
-from debt_control.security import get_current_user
 
 router = APIRouter()
 
-T_Session = Annotated[Session, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+CurrentUser = Annotated[Principal, Depends(get_current_principal)]
 
 router = APIRouter(prefix='/category', tags=['category'])
 
 
 @router.get('/', response_model=ListCategories)
-def list_categories(
+async def list_categories(
     session: T_Session,
     user: CurrentUser,
     category_filter: Annotated[FilterCategory, Query()],
@@ -34,23 +44,93 @@ def list_categories(
 
     if category_filter.description:
         query = query.filter(
-            Category.description.contains(category_filter.description)
+            search_filter(category_filter.description, Category.description)
+        )
+
+        if category_filter.rank:
+            query = query.order_by(
+                similarity_rank(
+                    category_filter.description, Category.description
+                ).desc(),
+                Category.id,
+            )
+
+    category = (
+        await session.scalars(
+            query.offset(category_filter.offset).limit(category_filter.limit)
         )
-    category = session.scalars(
-        query.offset(category_filter.offset).limit(category_filter.limit)
     ).all()
 
     return {'categories': category}
 
 
+@router.get('/summary', response_model=CategorySummaryList)
+async def summary_categories(
+    session: T_Session,
+    user: CurrentUser,
+    summary_filter: Annotated[FilterDashboard, Query()],
+):
+    amount = DebtInstallment.installmentamount
+    totals = [
+        func.count().label('total_debt'),
+        func.sum(amount).label('total_debt_value'),
+    ]
+    for state in DebtState:
+        is_state = DebtInstallment.state == state
+        totals += [
+            func.count().filter(is_state).label(f'total_{state.value}'),
+            func.sum(amount)
+            .filter(is_state)
+            .label(f'total_{state.value}_value'),
+        ]
+
+    # agrega as parcelas do período por categoria da dívida e só então
+    # junta as categorias, com cada tabela filtrada pelo índice de user_id
+    totals_query = (
+        select(Debt.category_id, *totals)
+        .join(DebtInstallment, DebtInstallment.debt_id == Debt.id)
+        .where(Debt.user_id == user.id, DebtInstallment.user_id == user.id)
+        .group_by(Debt.category_id)
+    )
+
+    if summary_filter.start_date:
+        totals_query = totals_query.filter(
+            DebtInstallment.duedate >= summary_filter.start_date
+        )
+
+    if summary_filter.end_date:
+        totals_query = totals_query.filter(
+            DebtInstallment.duedate <= summary_filter.end_date
+        )
+
+    category_totals = totals_query.subquery()
+    query = (
+        select(
+            Category.id,
+            Category.description,
+            *[category_totals.c[total.name] for total in totals],
+        )
+        .join(category_totals, category_totals.c.category_id == Category.id)
+        .where(Category.user_id == user.id)
+        .order_by(category_totals.c.total_debt_value.desc(), Category.id)
+    )
+
+    return {
+        'categories': [
+            CategorySummary.from_totals(row)
+            for row in await session.execute(query)
+        ]
+    }
+
+
 @router.post('/', response_model=CategoryPublic)
-def create_category(
+async def create_category(
     category: CategorySchema, user: CurrentUser, session: T_Session
 ):
-    db_description = session.scalar(
+    db_description = await session.scalar(
         select(Category).where(
             Category.user_id == user.id,
-            Category.description.contains(category.description),
+            exact_match(category.description, Category.description),
         )
     )
 
@@ -63,15 +143,17 @@ def create_category(
     db_category = category.model_dump()
     db = Category(**db_category, user_id=user.id)
     session.add(db)
-    session.commit()
-    session.refresh(db)
+    await session.commit()
+    await session.refresh(db)
 
     return db
 
 
 @router.delete('/{category_id}', response_model=Message)
-def delete_category(category_id: int, session: T_Session, user: CurrentUser):
-    category = session.scalar(
+async def delete_category(
+    category_id: int, session: T_Session, user: CurrentUser
+):
+    category = await session.scalar(
         select(Category).where(
             Category.user_id == user.id, Category.id == category_id
         )
@@ -82,8 +164,14 @@ def delete_category(category_id: int, session: T_Session, user: CurrentUser):
             status_code=HTTPStatus.NOT_FOUND, detail='Category not found.'
         )
 
-    session.delete(category)
+    await session.run_sync(
+        remove_installments,
+        DebtInstallment.debt_id.in_(
+            select(Debt.id).where(Debt.category_id == category.id)
+        ),
+    )
+    await session.delete(category)
 
-    session.commit()
+    await session.commit()
 
     return {'message': 'Category has been deleted successfully.'}
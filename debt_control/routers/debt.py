@@ -1,104 +1,181 @@
-from datetime import datetime
 from http import HTTPStatus
 from typing import Annotated
 
-from dateutil.relativedelta import relativedelta
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from debt_control.database import get_session
+from debt_control.database import get_session, get_sync_session
 from debt_control.models import (
     Category,
     Debt,
     DebtInstallment,
     DebtState,
-    User,
 )
 from debt_control.schemas import (
+    AuthenticatedUser,
     DebtCategory,
     DebtDashboard,
+    DebtDashboardSeries,
     DebtInstallmentsList,
     DebtList,
     DebtPublic,
+    ExportFormat,
     FilterDashboard,
+    FilterDashboardSeries,
     FilterDebt,
     FilterDebtInstallments,
+    FilterExport,
+    ImportSummary,
     Message,
     PaidInstallments,
     PayInstallentsSchema,
+    PayInstallmentsBulk,
+    PaymentSummary,
+    Principal,
 )
-from debt_control.security import get_current_user
-from debt_control.utils.firebase import send_notification
+from debt_control.security import get_current_principal, get_current_user
+from debt_control.services.export_service import (
+    export_csv,
+    export_ndjson,
+    export_query,
+)
+from debt_control.services.import_service import (
+    InvalidImportLine,
+    import_debts,
+    parse_csv,
+    parse_ofx,
+)
+from debt_control.services.installment_service import (
+    build_installments,
+    initial_state,
+    insert_installments,
+)
+from debt_control.services.outbox_service import enqueue_notification
+from debt_control.services.summary_service import (
+    SummaryChanges,
+    period_totals,
+    remove_installments,
+    summary_totals,
+)
+from debt_control.utils.pagination import decode_cursor, encode_cursor
+from debt_control.utils.search import search_filter, similarity_rank
 
 router = APIRouter()
 
-T_Session = Annotated[Session, Depends(get_session)]
-CurrentUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+T_SyncSession = Annotated[Session, Depends(get_sync_session)]
+CurrentUser = Annotated[Principal, Depends(get_current_principal)]
+CurrentProfile = Annotated[AuthenticatedUser, Depends(get_current_user)]
 
 router = APIRouter(prefix='/debt', tags=['debt'])
 
 
+def _decode_cursor(cursor: str):
+    try:
+        return decode_cursor(cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+        )
+
+
 @router.get('/', response_model=DebtList)
-def list_debt(
+async def list_debt(
     session: T_Session,
     user: CurrentUser,
     debt_filter: Annotated[FilterDebt, Query()],
 ):
-    DebtInstallment.update_overdue(session)
-
-    Debt.update_overdue_debts(session)
+    paid = (
+        select(
+            DebtInstallment.debt_id,
+            func.count().label('paid_installments'),
+        )
+        .where(
+            DebtInstallment.user_id == user.id,
+            DebtInstallment.state == DebtState.pay,
+        )
+        .group_by(DebtInstallment.debt_id)
+        .subquery()
+    )
 
-    query = select(Debt).where(Debt.user_id == user.id)
+    query = (
+        select(
+            Debt,
+            Category.description,
+            func.coalesce(paid.c.paid_installments, 0),
+        )
+        .join(
+            Category,
+            (Category.id == Debt.category_id) & (Category.user_id == user.id),
+        )
+        .outerjoin(paid, paid.c.debt_id == Debt.id)
+        .where(Debt.user_id == user.id)
+    )
 
+    search_columns = (Debt.description, Debt.note)
     if debt_filter.description:
         query = query.filter(
-            Debt.description.contains(debt_filter.description)
+            search_filter(debt_filter.description, *search_columns)
         )
 
     if debt_filter.state:
         query = query.filter(Debt.state == debt_filter.state)
 
-    debts = session.scalars(
-        query.offset(debt_filter.offset).limit(debt_filter.limit)
-    ).all()
-
-    debts_public = []
-    for debt in debts:
-        pay = len(
-            session.scalars(
-                select(DebtInstallment).where(
-                    DebtInstallment.debt_id == debt.id,
-                    DebtInstallment.state == 'pay',
-                )
-            ).all()
+    # por relevância a paginação é só por offset
+    ranked = bool(debt_filter.description and debt_filter.rank)
+    if ranked and debt_filter.cursor:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Cursor cannot be combined with rank',
         )
 
-        category = session.scalar(
-            select(Category).where(Category.id == Debt.category_id)
-        )
+    if ranked:
+        query = query.order_by(
+            similarity_rank(debt_filter.description, *search_columns).desc(),
+            Debt.id,
+        ).offset(debt_filter.offset)
+    else:
+        query = query.order_by(Debt.purchasedate, Debt.id)
 
+        if debt_filter.cursor:
+            query = query.filter(
+                tuple_(Debt.purchasedate, Debt.id)
+                > _decode_cursor(debt_filter.cursor)
+            )
+        else:
+            query = query.offset(debt_filter.offset)
+
+    rows = (await session.execute(query.limit(debt_filter.limit))).all()
+
+    debts_public = []
+    for debt, category, pay in rows:
         debt_dict = debt.__dict__.copy()
         debt_dict['paid_installments'] = pay
-        debt_dict['category'] = category.description
+        debt_dict['category'] = category
         debts_public.append(DebtCategory(**debt_dict))
 
-    if debts_public:
-        debt_sorted = sorted(debts_public, key=lambda e: e.purchasedate)
-        return {'debt': debt_sorted}
+    next_cursor = None
+    if debts_public and len(debts_public) == debt_filter.limit and not ranked:
+        last = debts_public[-1]
+        next_cursor = encode_cursor(last.purchasedate, last.id)
 
-    return {'debt': debts_public}
+    return {'debt': debts_public, 'next_cursor': next_cursor}
 
 
 @router.post('/', response_model=DebtPublic)
-def create_debt(debt: PaidInstallments, user: CurrentUser, session: T_Session):
+async def create_debt(
+    debt: PaidInstallments, user: CurrentUser, session: T_Session
+):
     if isinstance(debt.plots, str):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail=f'Value invalid plots: {debt.plots}.',
         )
 
-    db_category = session.scalar(
+    db_category = await session.scalar(
         select(Category).where(
             Category.id == debt.category_id, Category.user_id == user.id
         )
@@ -119,143 +196,191 @@ def create_debt(debt: PaidInstallments, user: CurrentUser, session: T_Session):
         debt.paidinstallments if debt.paidinstallments else 0
     )
 
-    plots_count = debt.plots if debt.plots else 0
-    date = debt.purchasedate
-    value = round(debt.value / debt.plots if debt.plots else 1, 2)
+    plots_count = debt.plots if debt.plots else 1
 
     db_debt = Debt(
         description=debt.description,
         category_id=debt.category_id,
         value=debt.value,
-        plots=debt.plots if debt.plots else 1,
+        plots=plots_count,
         purchasedate=debt.purchasedate,
-        state=(
-            DebtState.pay
-            if count_paidinstallments >= plots_count
-            else DebtState.pending
+        state=initial_state(
+            debt.purchasedate, plots_count, count_paidinstallments
         ),
         note=debt.note,
         user_id=user.id,
     )
 
     session.add(db_debt)
-    session.flush()
-
-    if plots_count > 1:
-        for count in range(1, plots_count + 1):
-            db_todo = DebtInstallment(
-                debt_id=db_debt.id,
-                installmentamount=value,
-                number=count,
-                duedate=date,
-                amount=None if count > count_paidinstallments else value,
-                paid_date=None if count > count_paidinstallments else date,
-                state=(
-                    DebtState.pending
-                    if count > count_paidinstallments
-                    else DebtState.pay
-                ),
-                user_id=user.id,
-            )
+    await session.flush()
 
-            date += relativedelta(months=1)
-            session.add(db_todo)
-
-        session.commit()
-        session.refresh(db_debt)
-        return db_debt
-
-    db_debt_installment = DebtInstallment(
-        debt_id=db_debt.id,
-        installmentamount=value,
-        number=1,
-        duedate=date,
-        amount=value if count_paidinstallments == 1 else None,
-        paid_date=(date if count_paidinstallments == 1 else None),
-        state=(
-            DebtState.pay
-            if count_paidinstallments == 1
-            else DebtState.overdue
-            if date < date.today()
-            else DebtState.pending
-        ),
-        user_id=user.id,
+    await session.run_sync(
+        insert_installments,
+        build_installments(db_debt, count_paidinstallments),
     )
 
-    session.add(db_debt_installment)
-    session.commit()
-    session.refresh(db_debt)
+    await session.commit()
+    await session.refresh(db_debt)
     return db_debt
 
 
-@router.patch('/{debt_id}', response_model=Message)
-def path_debt(
-    debt_id: int,
+@router.get('/export')
+async def export_debts(
     session: T_Session,
     user: CurrentUser,
-    plots: PayInstallentsSchema,
+    export_filter: Annotated[FilterExport, Query()],
 ):
-    db_debt = session.scalar(
-        select(Debt).where(Debt.user_id == user.id, Debt.id == debt_id)
+    query = export_query(user.id, export_filter.state)
+
+    if export_filter.format == ExportFormat.ndjson:
+        return StreamingResponse(
+            export_ndjson(session, query), media_type='application/x-ndjson'
+        )
+
+    return StreamingResponse(
+        export_csv(session, query),
+        media_type='text/csv',
+        headers={'Content-Disposition': 'attachment; filename="debts.csv"'},
     )
 
-    if not db_debt:
+
+@router.post('/import', response_model=ImportSummary)
+def import_debts_file(
+    file: UploadFile, user: CurrentUser, session: T_SyncSession
+):
+    # rota síncrona: leitura, validação e INSERTs de um arquivo grande
+    # rodam numa thread do pool, sem travar o event loop
+    is_ofx = (file.filename or '').lower().endswith('.ofx')
+    rows = (parse_ofx if is_ofx else parse_csv)(file.file)
+
+    try:
+        summary = import_debts(session, user.id, rows)
+    except InvalidImportLine as error:
+        session.rollback()
         raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail='Debt not found'
+            status_code=HTTPStatus.BAD_REQUEST, detail=str(error)
         )
 
-    plot_ids = plots.plot_ids
+    session.commit()
+    return summary
 
-    installments = session.scalars(
-        select(DebtInstallment).where(
-            DebtInstallment.debt_id == debt_id,
-            DebtInstallment.id.in_(plot_ids),
-            DebtInstallment.user_id == user.id,
-            DebtInstallment.state.in_([DebtState.pending, DebtState.overdue]),
+
+@router.patch('/{debt_id}', response_model=Message)
+async def path_debt(
+    debt_id: int,
+    session: T_Session,
+    user: CurrentProfile,
+    plots: PayInstallentsSchema,
+):
+    paid = await session.run_sync(
+        DebtInstallment.pay,
+        user.id,
+        plots.plot_ids,
+        plots.amount,
+        DebtInstallment.debt_id == debt_id,
+    )
+
+    if not paid or len(paid) != len(plots.plot_ids):
+        await session.rollback()
+        db_debt = await session.scalar(
+            select(Debt.id).where(Debt.user_id == user.id, Debt.id == debt_id)
         )
-    ).all()
+        if not db_debt:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND, detail='Debt not found'
+            )
 
-    if not installments or len(installments) != len(plot_ids):
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND,
             detail='One or more installments not found.',
         )
 
-    for installment in installments:
-        installment.state = DebtState.pay
-        installment.paid_date = datetime.today()
-        installment.amount = (
-            installment.installmentamount if plots.amount else plots.amount
+    descriptions = await session.run_sync(
+        Debt.update_paid_debts, user.id, [debt_id]
+    )
+
+    changes = SummaryChanges()
+    for installment in paid:
+        changes.move(
+            user.id,
+            installment.duedate,
+            installment.previous_state,
+            DebtState.pay,
+            installment.installmentamount,
+        )
+        enqueue_notification(
+            session,
+            user.fcm_token,
+            '✅ Parcela paga',
+            f'Sua parcela nº {installment.number}'
+            + f' da divida {descriptions[debt_id]} foi paga',
         )
 
-        if user.fcm_token:
-            send_notification(
-                user.fcm_token,
-                '✅ Parcela paga',
-                f'Sua parcela nº {installment.number}'
-                + f' da divida {db_debt.description} foi paga',
-            )
+    await session.run_sync(changes.apply)
+    await session.commit()
+    return {'message': 'paid installments'}
 
-    pending_installments = session.scalars(
-        select(DebtInstallment).where(
-            DebtInstallment.debt_id == debt_id,
-            DebtInstallment.user_id == user.id,
-            DebtInstallment.state == DebtState.pending,
+
+@router.post('/installments/pay', response_model=PaymentSummary)
+async def pay_installments(
+    session: T_Session,
+    user: CurrentProfile,
+    payment: PayInstallmentsBulk,
+):
+    criteria = []
+    if payment.start_date:
+        criteria.append(DebtInstallment.duedate >= payment.start_date)
+    if payment.end_date:
+        criteria.append(DebtInstallment.duedate <= payment.end_date)
+
+    paid = await session.run_sync(
+        DebtInstallment.pay,
+        user.id,
+        payment.plot_ids,
+        payment.amount,
+        *criteria,
+    )
+
+    if payment.plot_ids and len(paid) != len(payment.plot_ids):
+        await session.rollback()
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND,
+            detail='One or more installments not found.',
         )
-    ).first()
 
-    db_debt.state = DebtState.pending
+    debt_ids = sorted({installment.debt_id for installment in paid})
+    total = sum(installment.installmentamount for installment in paid)
 
-    if not pending_installments:
-        db_debt.state = DebtState.pay
+    if paid:
+        await session.run_sync(Debt.update_paid_debts, user.id, debt_ids)
 
-    session.commit()
-    return {'message': 'paid installments'}
+        changes = SummaryChanges()
+        for installment in paid:
+            changes.move(
+                user.id,
+                installment.duedate,
+                installment.previous_state,
+                DebtState.pay,
+                installment.installmentamount,
+            )
+        await session.run_sync(changes.apply)
+
+        # uma notificação para o lote todo
+        enqueue_notification(
+            session,
+            user.fcm_token,
+            '✅ Parcelas pagas',
+            f'{len(paid)} parcelas de {len(debt_ids)} dívidas foram pagas'
+            + f' (R$ {total:.2f})',
+        )
+
+    await session.commit()
+    return {'paid': len(paid), 'total': total, 'debts': debt_ids}
 
 
 @router.delete('/{debt_id}', response_model=Message)
-def delete_debt(debt_id: int, session: T_Session, user: CurrentUser):
-    debt = session.scalar(
+async def delete_debt(debt_id: int, session: T_Session, user: CurrentUser):
+    debt = await session.scalar(
         select(Debt).where(Debt.user_id == user.id, Debt.id == debt_id)
     )
 
@@ -264,14 +389,17 @@ def delete_debt(debt_id: int, session: T_Session, user: CurrentUser):
             status_code=HTTPStatus.NOT_FOUND, detail='Debt not found.'
         )
 
-    session.delete(debt)
-    session.commit()
+    await session.run_sync(
+        remove_installments, DebtInstallment.debt_id == debt.id
+    )
+    await session.delete(debt)
+    await session.commit()
 
     return {'message': 'Debt has been deleted successfully.'}
 
 
 @router.get('/{debt_id}/installments', response_model=DebtInstallmentsList)
-def list_installments(
+async def list_installments(
     debt_id: int,
     session: T_Session,
     user: CurrentUser,
@@ -288,31 +416,67 @@ def list_installments(
             DebtInstallment.state.in_([DebtState.pending, DebtState.overdue])
         )
 
-    debt = session.scalars(
-        query.offset(debt_filter.offset).limit(debt_filter.limit)
-    ).all()
+    query = query.order_by(DebtInstallment.duedate, DebtInstallment.id)
 
-    debt_sorted = sorted(debt, key=lambda e: e.duedate)
+    if debt_filter.cursor:
+        query = query.filter(
+            tuple_(DebtInstallment.duedate, DebtInstallment.id)
+            > _decode_cursor(debt_filter.cursor)
+        )
+    else:
+        query = query.offset(debt_filter.offset)
 
-    return {'debtinstallments': debt_sorted}
+    debt = (await session.scalars(query.limit(debt_filter.limit))).all()
+
+    next_cursor = None
+    if debt and len(debt) == debt_filter.limit:
+        next_cursor = encode_cursor(debt[-1].duedate, debt[-1].id)
+
+    return {'debtinstallments': debt, 'next_cursor': next_cursor}
 
 
 @router.get('/dashboard', response_model=DebtDashboard)
-def dashboard_debt(
+async def dashboard_debt(
     session: T_Session,
     user: CurrentUser,
     debt_filter: Annotated[FilterDashboard, Query()],
 ):
-    query = select(DebtInstallment).where(DebtInstallment.user_id == user.id)
-
-    if debt_filter.start_date:
-        query = query.filter(DebtInstallment.duedate >= debt_filter.start_date)
+    rows = summary_totals(
+        user.id, debt_filter.start_date, debt_filter.end_date
+    )
+    totals = [
+        func.sum(rows.c.count).label('total_debt'),
+        func.sum(rows.c.total).label('total_debt_value'),
+    ]
+    for state in DebtState:
+        is_state = rows.c.state == state
+        totals += [
+            func.sum(rows.c.count)
+            .filter(is_state)
+            .label(f'total_{state.value}'),
+            func.sum(rows.c.total)
+            .filter(is_state)
+            .label(f'total_{state.value}_value'),
+        ]
+
+    return DebtDashboard.from_totals(
+        (await session.execute(select(*totals))).one()
+    )
 
-    if debt_filter.end_date:
-        query = query.filter(DebtInstallment.duedate <= debt_filter.end_date)
 
-    debt = session.scalars(
-        query.offset(debt_filter.offset).limit(debt_filter.limit)
-    ).all()
+@router.get('/dashboard/series', response_model=DebtDashboardSeries)
+async def dashboard_series(
+    session: T_Session,
+    user: CurrentUser,
+    series_filter: Annotated[FilterDashboardSeries, Query()],
+):
+    query = period_totals(
+        user.id,
+        series_filter.start_date,
+        series_filter.end_date,
+        series_filter.interval.value,
+    )
 
-    return DebtDashboard.from_debts(debt)
+    return DebtDashboardSeries.from_rows(
+        series_filter.interval, (await session.execute(query)).all()
+    )
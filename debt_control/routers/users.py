@@ -4,11 +4,12 @@ from typing import Annotated
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy import select
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from debt_control.database import get_session
 from debt_control.models import User
 from debt_control.schemas import (
+    AuthenticatedUser,
     FilterPage,
     Message,
     UpdateFcmToken,
@@ -18,18 +19,19 @@ from debt_control.schemas import (
 )
 from debt_control.security import (
     get_current_user,
-    get_password_hash,
+    hash_password,
 )
+from debt_control.services.user_cache import invalidate_user
 
 router = APIRouter(prefix='/users', tags=['users'])
 
-T_Session = Annotated[Session, Depends(get_session)]
-CurrenteUser = Annotated[User, Depends(get_current_user)]
+T_Session = Annotated[AsyncSession, Depends(get_session)]
+CurrenteUser = Annotated[AuthenticatedUser, Depends(get_current_user)]
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
-def create_user(user: UserSchema, session: T_Session):
-    db_user = session.scalar(
+async def create_user(user: UserSchema, session: T_Session):
+    db_user = await session.scalar(
         select(User).where(
             (User.username == user.username) | (User.email == user.email)
         )
@@ -47,7 +49,7 @@ def create_user(user: UserSchema, session: T_Session):
                 detail='Email already exists',
             )
 
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password(user.password)
 
     db_user = User(
         username=user.username,
@@ -56,25 +58,27 @@ def create_user(user: UserSchema, session: T_Session):
         fcm_token=user.fcm_token,
     )
     session.add(db_user)
-    session.commit()
-    session.refresh(db_user)
+    await session.commit()
+    await session.refresh(db_user)
 
     return db_user
 
 
 @router.get('/', response_model=UserList)
-def read_users(
+async def read_users(
     session: T_Session, filter_users: Annotated[FilterPage, Query()]
 ):
-    users = session.scalars(
-        select(User).offset(filter_users.offset).limit(filter_users.limit)
+    users = (
+        await session.scalars(
+            select(User).offset(filter_users.offset).limit(filter_users.limit)
+        )
     ).all()
 
     return {'users': users}
 
 
 @router.put('/{user_id}', response_model=UserPublic)
-def update_user(
+async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
@@ -84,14 +88,18 @@ def update_user(
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
+    db_user = await session.get(User, current_user.id)
     try:
-        current_user.username = user.username
-        current_user.password = get_password_hash(user.password)
-        current_user.email = user.email
-        session.commit()
-        session.refresh(current_user)
+        db_user.username = user.username
+        db_user.password = await hash_password(user.password)
+        db_user.email = user.email
+        # revoga os tokens emitidos com a senha anterior
+        db_user.token_version += 1
+        await session.commit()
+        await session.refresh(db_user)
+        await invalidate_user(session, current_user.id)
 
-        return current_user
+        return db_user
 
     except IntegrityError:
         raise HTTPException(
@@ -100,7 +108,7 @@ def update_user(
 
 
 @router.delete('/{user_id}', response_model=Message)
-def delete_user(
+async def delete_user(
     user_id: int,
     session: T_Session,
     current_user: CurrenteUser,
@@ -110,15 +118,16 @@ def delete_user(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
-    session.delete(current_user)
-    session.commit()
+    await session.delete(await session.get(User, current_user.id))
+    await session.commit()
+    await invalidate_user(session, current_user.id)
 
     return {'message': 'User deleted'}
 
 
 @router.get('/{user_id}', response_model=UserPublic)
-def read_user_id(user_id: int, session: T_Session):
-    db_user = session.scalar(select(User).where(User.id == user_id))
+async def read_user_id(user_id: int, session: T_Session):
+    db_user = await session.scalar(select(User).where(User.id == user_id))
 
     if not db_user:
         raise HTTPException(
@@ -129,7 +138,7 @@ def read_user_id(user_id: int, session: T_Session):
 
 
 @router.patch('/{user_id}', response_model=UserPublic)
-def update_fcm_token(
+async def update_fcm_token(
     user_id: int,
     session: T_Session,
     current_user: CurrenteUser,
@@ -140,8 +149,10 @@ def update_fcm_token(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
 
-    current_user.fcm_token = user.fcm_token
-    session.commit()
-    session.refresh(current_user)
+    db_user = await session.get(User, current_user.id)
+    db_user.fcm_token = user.fcm_token
+    await session.commit()
+    await session.refresh(db_user)
+    await invalidate_user(session, current_user.id)
 
-    return current_user
+    return db_user
@@ -1,14 +1,65 @@
 from datetime import date, datetime, timedelta
-
-from pydantic import BaseModel, ConfigDict, EmailStr
+from decimal import Decimal
+from enum import Enum
+from typing import Annotated
+
+from pydantic import (
+    BaseModel,
+    BeforeValidator,
+    ConfigDict,
+    EmailStr,
+    Field,
+    PlainSerializer,
+    model_validator,
+)
 
 from debt_control.models import DebtState
 
+CENT = Decimal('0.01')
+
+
+def _to_cents(value):
+    # arredonda para centavos em vez de recusar o ruído do float
+    # (0.1 + 0.2); o que não vira número fica para o validador do Decimal
+    if isinstance(value, (int, float, str, Decimal)) and not isinstance(
+        value, bool
+    ):
+        try:
+            return Decimal(str(value)).quantize(CENT)
+        except ArithmeticError:
+            return value
+    return value
+
+
+# valor em reais com 2 casas; continua número no JSON
+Money = Annotated[
+    Decimal,
+    BeforeValidator(_to_cents),
+    Field(max_digits=14, decimal_places=2),
+    PlainSerializer(float, return_type=float, when_used='json'),
+]
+
 
 class Message(BaseModel):
     message: str
 
 
+class PoolStatus(BaseModel):
+    pool: str
+    size: int | None = None
+    checked_out: int | None = None
+    overflow: int | None = None
+    checkouts: int | None = None
+    timeouts: int | None = None
+    wait_avg_ms: float | None = None
+    wait_max_ms: float | None = None
+
+
+class DatabaseMetrics(BaseModel):
+    sync: PoolStatus
+    async_: PoolStatus | None = Field(None, alias='async')
+
+
 class UserSchema(BaseModel):
     username: str
     email: EmailStr
@@ -38,7 +89,21 @@ class Token(BaseModel):
 
 
 class TokenData(BaseModel):
-    username: str | None = None
+    user_id: int
+    token_version: int
+
+
+class Principal(BaseModel):
+    id: int
+    model_config = ConfigDict(frozen=True)
+
+
+class AuthenticatedUser(Principal):
+    username: str
+    email: EmailStr
+    fcm_token: str | None = None
+    token_version: int = 0
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 
 class FilterPage(BaseModel):
@@ -58,6 +123,7 @@ class CategoryPublic(CategorySchema):
 
 class FilterCategory(FilterPage):
     description: str | None = None
+    rank: bool = False
 
 
 class ListCategories(BaseModel):
@@ -67,7 +133,7 @@ class ListCategories(BaseModel):
 class DebtSchema(BaseModel):
     description: str
     category_id: int
-    value: float
+    value: Money
     plots: int | None
     purchasedate: date
     note: str | None = None
@@ -91,11 +157,14 @@ class DebtCategory(DebtPublic):
 
 class DebtList(BaseModel):
     debt: list[DebtCategory]
+    next_cursor: str | None = None
 
 
 class FilterDebt(FilterPage):
     description: str | None = None
     state: DebtState | None = None
+    cursor: str | None = None
+    rank: bool = False
 
 
 class DebtUpdate(BaseModel):
@@ -105,17 +174,85 @@ class DebtUpdate(BaseModel):
 class DebtInstallmentSchema(BaseModel):
     id: int
     debt_id: int
-    installmentamount: float
+    installmentamount: Money
     number: int
     duedate: date
-    amount: float | None = None
+    amount: Money | None = None
     paid_date: date | None = None
     state: DebtState
 
 
 class PayInstallentsSchema(BaseModel):
     plot_ids: list[int]
-    amount: float | None
+    # só o valor verdade importa: registra o valor da parcela como pago
+    amount: bool | Money | None
+
+
+# parcelas de qualquer dívida do usuário, por id ou por vencimento
+class PayInstallmentsBulk(BaseModel):
+    plot_ids: list[int] | None = None
+    start_date: date | None = None
+    end_date: date | None = None
+    amount: bool | Money | None = None
+
+    @model_validator(mode='after')
+    def check_selection(self):
+        # lista vazia é o mesmo que não filtrar por id, não um filtro vazio
+        self.plot_ids = self.plot_ids or None
+        if not self.plot_ids and not (self.start_date and self.end_date):
+            raise ValueError('inform plot_ids or start_date and end_date')
+        return self
+
+
+# uma linha do arquivo importado; a categoria vem pela descrição
+class DebtImportRow(BaseModel):
+    description: str
+    category: str
+    value: Annotated[Money, Field(gt=0)]
+    plots: int = Field(1, gt=0)
+    purchasedate: date
+    paidinstallments: int = Field(0, ge=0)
+    note: str | None = None
+
+
+class ImportSummary(BaseModel):
+    debts: int
+    installments: int
+    categories: int
+
+
+class ExportFormat(str, Enum):
+    csv = 'csv'
+    ndjson = 'ndjson'
+
+
+class FilterExport(BaseModel):
+    format: ExportFormat = ExportFormat.csv
+    state: DebtState | None = None
+
+
+# uma linha por parcela, com os dados da dívida e da categoria repetidos
+class DebtExportRow(BaseModel):
+    debt_id: int
+    description: str
+    category: str
+    value: Money
+    plots: int
+    purchasedate: date
+    debt_state: DebtState
+    note: str | None = None
+    number: int
+    duedate: date
+    installmentamount: Money
+    amount: Money | None = None
+    paid_date: date | None = None
+    state: DebtState
+
+
+class PaymentSummary(BaseModel):
+    paid: int
+    total: Money
+    debts: list[int]
 
 
 class DebtInstallmentsPublic(DebtInstallmentSchema):
@@ -126,13 +263,15 @@ class DebtInstallmentsPublic(DebtInstallmentSchema):
 
 class DebtInstallmentsList(BaseModel):
     debtinstallments: list[DebtInstallmentSchema]
+    next_cursor: str | None = None
 
 
 class FilterDebtInstallments(FilterPage):
     state: DebtState | None = None
+    cursor: str | None = None
 
 
-class FilterDashboard(FilterPage):
+class FilterDashboard(BaseModel):
     start_date: date | None = date.today().replace(day=1)
     end_date: date | None = (
         start_date.replace(day=28) + timedelta(days=4)
@@ -140,70 +279,80 @@ class FilterDashboard(FilterPage):
 
 
 class DebtDashboard(BaseModel):
-    total_debt_value: float
-    total_debt: float
+    total_debt_value: Money
+    total_debt: int
+
+    total_pay_value: Money
+    total_pay: int
+
+    total_pending_value: Money
+    total_pending: int
+
+    total_overdue_value: Money
+    total_overdue: int
+
+    total_canceled_value: Money
+    total_canceled: int
+
+    @classmethod
+    def from_totals(cls, totals):
+        return cls(**{
+            field: (value or 0)
+            if field in DebtDashboard.model_fields
+            else value
+            for field, value in totals._mapping.items()
+        })
+
+
+class CategorySummary(DebtDashboard):
+    id: int
+    description: str
+
+
+class CategorySummaryList(BaseModel):
+    categories: list[CategorySummary]
+
+
+class SeriesInterval(str, Enum):
+    month = 'month'
+    week = 'week'
+
+
+class FilterDashboardSeries(BaseModel):
+    start_date: date
+    end_date: date
+    interval: SeriesInterval = SeriesInterval.month
+
+    @model_validator(mode='after')
+    def check_range(self):
+        if self.end_date < self.start_date:
+            raise ValueError('end_date must not be before start_date')
+        return self
 
-    total_pay_value: float
-    total_pay: float
 
-    total_pending_value: float
-    total_pending: float
+# colunar: uma lista de períodos e, por estado, listas alinhadas a ela;
+# períodos sem parcelas e estados sem valores ficam de fora
+class StateSeries(BaseModel):
+    count: list[int]
+    value: list[Money]
 
-    total_overdue_value: float
-    total_overdue: float
 
-    total_canceled_value: float
-    total_canceled: float
+class DebtDashboardSeries(BaseModel):
+    interval: SeriesInterval
+    periods: list[date]
+    states: dict[DebtState, StateSeries]
 
     @classmethod
-    def from_debts(cls, debts):
-        total_debt_value = 0
-        total_debt = []
-
-        total_pay_value = 0
-        total_pay = []
-
-        total_pending_value = 0
-        total_pending = []
-
-        total_overdue_value = 0
-        total_overdue = []
-
-        total_canceled_value = 0
-        total_canceled = []
-
-        today = date.today()
-
-        for debt in debts:
-            value = debt.installmentamount
-            duedate = debt.duedate
-            state = debt.state
-
-            total_debt_value += value
-            total_debt.append(value)
-
-            if state == 'pay':
-                total_pay_value += value
-                total_pay.append(value)
-            elif state == 'pending':
-                total_pending_value += value
-                total_pending.append(value)
-            elif state == 'canceled':
-                total_canceled_value += value
-                total_canceled.append(value)
-            elif duedate < today:  # Verifica se a dívida está vencida
-                total_overdue_value += value
-                total_overdue.append(value)
-
-        return cls(
-            total_debt_value=round(total_debt_value, 2),
-            total_debt=len(total_debt),
-            total_pay_value=round(total_pay_value, 2),
-            total_pay=len(total_pay),
-            total_pending_value=round(total_pending_value, 2),
-            total_pending=len(total_pending),
-            total_overdue_value=round(total_overdue_value, 2),
-            total_overdue=len(total_overdue),
-            total_canceled_value=round(total_canceled_value, 2),
-            total_canceled=len(total_canceled),
-        )
+    def from_rows(cls, interval, rows):
+        periods = sorted({row.period for row in rows})
+        index = {period: number for number, period in enumerate(periods)}
+        states = {}
+        for row in rows:
+            series = states.setdefault(
+                row.state,
+                {'count': [0] * len(periods), 'value': [0] * len(periods)},
+            )
+            series['count'][index[row.period]] = row.count
+            series['value'][index[row.period]] = row.total
+
+        return cls(interval=interval, periods=periods, states=states)
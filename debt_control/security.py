@@ -5,17 +5,25 @@ from zoneinfo import ZoneInfo
 from fastapi import Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer
 from jwt import DecodeError, ExpiredSignatureError, decode, encode
-from pwdlib import PasswordHash
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from debt_control.database import get_session
 from debt_control.models import User
-from debt_control.schemas import TokenData
+from debt_control.schemas import AuthenticatedUser, Principal, TokenData
+from debt_control.services.user_cache import user_cache
 from debt_control.settings import Settings
+from debt_control.utils.password import (
+    HashingPool,
+    PoolOverloaded,
+    get_password_hash,
+    verify_and_update_password,
+)
 
 settings = Settings()
-pwd_context = PasswordHash.recommended()
+hashing_pool = HashingPool(
+    settings.HASH_POOL_WORKERS, settings.HASH_POOL_QUEUE_SIZE
+)
 
 
 def create_access_token(data: dict):
@@ -30,19 +38,43 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-def get_password_hash(password: str):
-    return pwd_context.hash(password)
+async def _run_hashing(fn, *args):
+    try:
+        return await hashing_pool.run(fn, *args)
+    except PoolOverloaded:
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Server busy, try again later',
+            headers={'Retry-After': '1'},
+        )
+
 
+async def hash_password(password: str):
+    return await _run_hashing(get_password_hash, password)
 
-def verify_password(plain_password: str, hashed_password: str):
-    return pwd_context.verify(plain_password, hashed_password)
+
+async def check_and_update_password(plain_password: str, hashed_password: str):
+    return await _run_hashing(
+        verify_and_update_password, plain_password, hashed_password
+    )
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
 
 
-def get_current_user(
-    session: Session = Depends(get_session),
+def create_user_token(user):
+    # o id e a versão no token dispensam a busca do usuário por e-mail
+    return create_access_token(
+        data={
+            'sub': user.email,
+            'uid': user.id,
+            'ver': user.token_version,
+        }
+    )
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
     token: str = Depends(oauth2_scheme),
 ):
     credentials_exception = HTTPException(
@@ -55,20 +87,31 @@ def get_current_user(
         payload = decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        username: str = payload.get('sub')
-        if not username:
-            raise credentials_exception
-        token_data = TokenData(username=username)
-    except DecodeError:
-        raise credentials_exception
-    except ExpiredSignatureError:
+        token_data = TokenData(
+            user_id=payload.get('uid'), token_version=payload.get('ver')
+        )
+    except (DecodeError, ExpiredSignatureError, ValidationError):
         raise credentials_exception
 
-    user = session.scalar(
-        select(User).where(User.email == token_data.username)
-    )
-
+    user = user_cache.get(token_data.user_id)
     if not user:
+        db_user = await session.get(User, token_data.user_id)
+
+        if not db_user:
+            raise credentials_exception
+
+        user = AuthenticatedUser.model_validate(db_user)
+        user_cache.set(token_data.user_id, user)
+
+    # token emitido antes da última troca de senha
+    if user.token_version != token_data.token_version:
         raise credentials_exception
 
     return user
+
+
+async def get_current_principal(
+    user: AuthenticatedUser = Depends(get_current_user),
+):
+    # só o id, para as rotas que apenas filtram por user_id
+    return Principal(id=user.id)
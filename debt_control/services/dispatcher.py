@@ -0,0 +1,127 @@
+import atexit
+import logging
+import time
+from dataclasses import dataclass
+from queue import Empty, Queue
+from threading import Lock, Thread
+
+logger = logging.getLogger(__name__)
+
+# limite do FCM para messaging.send_each
+MAX_BATCH_SIZE = 500
+
+_STOP = object()
+
+
+@dataclass(frozen=True)
+class Notification:
+    token: str
+    title: str
+    body: str
+
+
+# transporte local para testes e benchmark, sem rede
+class FakeTransport:
+    def __init__(self, latency: float = 0.0, failures: int = 0):
+        self.latency = latency
+        self.failures = failures
+        self.batches = []
+        self._lock = Lock()
+
+    def __call__(self, notifications):
+        time.sleep(self.latency)
+        with self._lock:
+            if self.failures:
+                self.failures -= 1
+                return notifications
+            self.batches.append(notifications)
+        return []
+
+    @property
+    def sent(self):
+        return [n for batch in self.batches for n in batch]
+
+
+# fila em memória com workers que enviam notificações em lotes; o
+# transporte recebe a lista e devolve as que falharam e podem ser reenviadas
+class NotificationDispatcher:
+    # tempo que um worker espera por mais itens antes de enviar o lote
+    linger = 0.05
+
+    def __init__(
+        self,
+        transport,
+        *,
+        workers: int = 4,
+        batch_size: int = MAX_BATCH_SIZE,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+    ):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = min(batch_size, MAX_BATCH_SIZE)
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._queue = Queue()
+        self._threads = []
+        self._lock = Lock()
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return
+            self._threads = [
+                Thread(target=self._run, daemon=True)
+                for _ in range(self.workers)
+            ]
+            for thread in self._threads:
+                thread.start()
+        atexit.register(self.stop)
+
+    def stop(self, timeout: float | None = None):
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for _ in threads:
+            self._queue.put(_STOP)
+        for thread in threads:
+            thread.join(timeout)
+        atexit.unregister(self.stop)
+
+    def submit(self, notification: Notification):
+        self.start()
+        self._queue.put(notification)
+
+    def _run(self):
+        stopped = False
+        while not stopped:
+            batch, stopped = self._next_batch()
+            if batch:
+                self._send(batch)
+
+    def _next_batch(self):
+        batch = []
+        item = self._queue.get()
+        while item is not _STOP:
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, False
+            try:
+                item = self._queue.get(timeout=self.linger)
+            except Empty:
+                return batch, False
+        return batch, True
+
+    def _send(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                batch = self.transport(batch)
+            except Exception:
+                logger.exception('Falha ao enviar notificações')
+
+            if not batch:
+                return
+
+            if attempt < self.max_retries:
+                time.sleep(self.backoff * 2**attempt)
+
+        logger.warning('%d notificações descartadas', len(batch))
@@ -0,0 +1,84 @@
+import csv
+import io
+from enum import Enum
+
+from sqlalchemy import select
+
+from debt_control.models import Category, Debt, DebtInstallment
+from debt_control.schemas import DebtExportRow
+
+# linhas buscadas por vez no cursor do servidor
+EXPORT_BATCH = 1000
+
+EXPORT_COLUMNS = list(DebtExportRow.model_fields)
+
+
+def export_query(user_id: int, state=None):
+    query = (
+        select(
+            Debt.id.label('debt_id'),
+            Debt.description,
+            Category.description.label('category'),
+            Debt.value,
+            Debt.plots,
+            Debt.purchasedate,
+            Debt.state.label('debt_state'),
+            Debt.note,
+            DebtInstallment.number,
+            DebtInstallment.duedate,
+            DebtInstallment.installmentamount,
+            DebtInstallment.amount,
+            DebtInstallment.paid_date,
+            DebtInstallment.state,
+        )
+        .join(
+            Category,
+            (Category.id == Debt.category_id) & (Category.user_id == user_id),
+        )
+        .join(
+            DebtInstallment,
+            (DebtInstallment.debt_id == Debt.id)
+            & (DebtInstallment.user_id == user_id),
+        )
+        .where(Debt.user_id == user_id)
+        .order_by(Debt.purchasedate, Debt.id, DebtInstallment.number)
+    )
+
+    if state:
+        query = query.where(Debt.state == state)
+
+    return query.execution_options(yield_per=EXPORT_BATCH)
+
+
+async def _partitions(session, query):
+    result = await session.stream(query)
+    async for rows in result.partitions():
+        yield rows
+
+
+def _csv_row(row):
+    # enums pelo valor; Decimal e date já saem no formato certo
+    return [value.value if isinstance(value, Enum) else value for value in row]
+
+
+async def export_csv(session, query):
+    # o cabeçalho sai antes da consulta, então o primeiro byte é imediato
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buffer.getvalue()
+
+    async for rows in _partitions(session, query):
+        buffer.seek(0)
+        buffer.truncate()
+        for row in rows:
+            writer.writerow(_csv_row(row))
+        yield buffer.getvalue()
+
+
+async def export_ndjson(session, query):
+    async for rows in _partitions(session, query):
+        yield ''.join(
+            DebtExportRow.model_validate(row._mapping).model_dump_json() + '\n'
+            for row in rows
+        )
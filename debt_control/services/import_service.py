@@ -0,0 +1,199 @@
+import csv
+import re
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from itertools import islice
+
+from pydantic import ValidationError
+from sqlalchemy import func, insert, select
+
+from debt_control.models import Category, Debt, DebtInstallment
+from debt_control.schemas import DebtImportRow
+from debt_control.services.installment_service import (
+    build_installments,
+    initial_state,
+    summarize_installments,
+)
+
+CHUNK_SIZE = 1000
+
+# lançamentos de extrato OFX não trazem categoria
+OFX_CATEGORY = 'Importados'
+
+OFX_TAG = re.compile(r'<(/?)(\w+)>([^<\r\n]*)')
+
+ImportedDebt = namedtuple(
+    'ImportedDebt', ['id', 'user_id', 'value', 'plots', 'purchasedate']
+)
+
+
+class InvalidImportLine(ValueError):
+    def __init__(self, line: int, reason: str):
+        super().__init__(f'Invalid line {line}: {reason}')
+
+
+def _validate(line: int, data: dict):
+    try:
+        return DebtImportRow.model_validate(data)
+    except ValidationError as error:
+        problem = error.errors()[0]
+        field = '.'.join(str(part) for part in problem['loc'])
+        raise InvalidImportLine(line, f'{field}: {problem["msg"]}')
+
+
+def parse_csv(lines):
+    # colunas: description, category, value, plots, purchasedate,
+    # paidinstallments e note; as três últimas são opcionais
+    reader = csv.DictReader(line.decode('utf-8-sig') for line in lines)
+    for row in reader:
+        yield _validate(
+            reader.line_num,
+            {field: value for field, value in row.items() if value},
+        )
+
+
+def _ofx_debt(line: int, transaction: dict, category: str):
+    try:
+        amount = Decimal(transaction['TRNAMT'].replace(',', '.'))
+        posted = datetime.strptime(transaction['DTPOSTED'][:8], '%Y%m%d')
+    except (KeyError, ArithmeticError, ValueError) as error:
+        raise InvalidImportLine(line, repr(error))
+
+    # só débitos viram dívidas
+    if amount >= 0:
+        return None
+
+    return _validate(
+        line,
+        {
+            'description': transaction.get('NAME') or transaction.get('MEMO'),
+            'category': category,
+            'value': -amount,
+            'purchasedate': posted.date(),
+            'note': transaction.get('MEMO'),
+        },
+    )
+
+
+def parse_ofx(lines, category: str = OFX_CATEGORY):
+    # lê tag a tag, serve tanto para o OFX 1.x (SGML) quanto o 2.x (XML)
+    encoding = 'utf-8'
+    transaction = None
+    for number, line in enumerate(lines, start=1):
+        if line.startswith(b'CHARSET:') and b'1252' in line:
+            encoding = 'cp1252'
+
+        text = line.decode(encoding, errors='replace')
+        for closing, name, value in OFX_TAG.findall(text):
+            tag = name.upper()
+            if tag == 'STMTTRN':
+                if closing and transaction is not None:
+                    debt = _ofx_debt(number, transaction, category)
+                    if debt:
+                        yield debt
+                transaction = None if closing else {}
+            elif transaction is not None and not closing:
+                transaction[tag] = value.strip()
+
+
+def _create_categories(session, user_id, descriptions):
+    created = session.execute(
+        insert(Category).returning(Category.description, Category.id),
+        [
+            {'description': description, 'user_id': user_id}
+            for description in sorted(descriptions)
+        ],
+    ).all()
+    return {description.lower(): id for description, id in created}
+
+
+def _reserve_ids(session, model, count):
+    # ids tirados da sequência antes, para as dívidas irem por COPY e as
+    # parcelas já saberem a qual dívida pertencem
+    return session.scalars(
+        select(
+            func.nextval(
+                func.pg_get_serial_sequence(model.__tablename__, 'id')
+            )
+        ).select_from(func.generate_series(1, count))
+    ).all()
+
+
+def _copy(session, model, rows):
+    # COPY em vez de INSERT: o lote vai num único fluxo, sem um comando
+    # por linha nem um INSERT com milhares de parâmetros; a importação
+    # roda sempre na sessão síncrona
+    if not rows:
+        return
+
+    columns = list(rows[0])
+    cursor = session.connection().connection.cursor()
+    statement = 'COPY {} ({}) FROM STDIN'.format(
+        model.__tablename__, ', '.join(columns)
+    )
+    with cursor.copy(statement) as copy:
+        for row in rows:
+            copy.write_row([row[column] for column in columns])
+
+
+def import_debts(session, user_id: int, rows, chunk_size: int = CHUNK_SIZE):
+    # categorias resolvidas por descrição num mapa em memória, sem
+    # diferenciar maiúsculas como o create_category; dívidas e parcelas
+    # gravadas por COPY, um lote por vez
+    categories = dict(
+        session.execute(
+            select(func.lower(Category.description), Category.id).where(
+                Category.user_id == user_id
+            )
+        ).all()
+    )
+    summary = {'debts': 0, 'installments': 0, 'categories': 0}
+    today = date.today()
+
+    rows = iter(rows)
+    while chunk := list(islice(rows, chunk_size)):
+        # a primeira grafia encontrada no arquivo dá nome à categoria nova
+        missing = {}
+        for row in chunk:
+            key = row.category.lower()
+            if key not in categories:
+                missing.setdefault(key, row.category)
+        if missing:
+            categories.update(
+                _create_categories(session, user_id, missing.values())
+            )
+            summary['categories'] += len(missing)
+
+        debts = []
+        installments = []
+        debt_ids = _reserve_ids(session, Debt, len(chunk))
+        for debt_id, row in zip(debt_ids, chunk):
+            debts.append({
+                'id': debt_id,
+                'description': row.description,
+                'value': row.value,
+                'plots': str(row.plots),
+                'purchasedate': row.purchasedate,
+                'state': initial_state(
+                    row.purchasedate, row.plots, row.paidinstallments, today
+                ),
+                'note': row.note,
+                'user_id': user_id,
+                'category_id': categories[row.category.lower()],
+            })
+            debt = ImportedDebt(
+                debt_id, user_id, row.value, row.plots, row.purchasedate
+            )
+            installments += build_installments(
+                debt, row.paidinstallments, today
+            )
+
+        _copy(session, Debt, debts)
+        _copy(session, DebtInstallment, installments)
+        summarize_installments(session, installments)
+
+        summary['debts'] += len(debts)
+        summary['installments'] += len(installments)
+
+    return summary
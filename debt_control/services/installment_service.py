@@ -0,0 +1,93 @@
+from calendar import monthrange
+from datetime import date
+from decimal import Decimal
+
+from sqlalchemy import insert
+
+from debt_control.models import Debt, DebtInstallment, DebtState
+from debt_control.services.summary_service import SummaryChanges
+
+
+def split_value(value: Decimal, plots: int) -> list[Decimal]:
+    # divide em centavos e distribui o resto nas primeiras parcelas,
+    # assim a soma das parcelas fecha exatamente com o valor da dívida
+    cents, remainder = divmod(round(value * 100), plots)
+    return [
+        Decimal(cents + (1 if number < remainder else 0)) / 100
+        for number in range(plots)
+    ]
+
+
+def add_months(day: date, months: int) -> date:
+    # mesmo ajuste de fim de mês do relativedelta (31/01 + 1 -> 28/02),
+    # sem o custo dele em cada parcela de uma importação grande
+    month = day.month - 1 + months
+    year, month = day.year + month // 12, month % 12 + 1
+    return day.replace(
+        year=year, month=month, day=min(day.day, monthrange(year, month)[1])
+    )
+
+
+def initial_state(
+    purchasedate: date, plots: int, paid: int, today: date | None = None
+):
+    # mesma regra do build_installments: se a primeira parcela em aberto
+    # já venceu, a dívida nasce vencida
+    today = today or date.today()
+    if paid >= plots:
+        return DebtState.pay
+    if add_months(purchasedate, paid) < today:
+        return DebtState.overdue
+    return DebtState.pending
+
+
+def build_installments(debt: Debt, paid: int, today: date | None = None):
+    today = today or date.today()
+    installments = []
+
+    for index, amount in enumerate(split_value(debt.value, int(debt.plots))):
+        number = index + 1
+        # sempre a partir da data da compra, para não acumular o ajuste
+        # de fim de mês (31/01 -> 28/02 -> 28/03)
+        duedate = add_months(debt.purchasedate, index)
+        is_paid = number <= paid
+
+        installments.append({
+            'debt_id': debt.id,
+            'user_id': debt.user_id,
+            'installmentamount': amount,
+            'number': number,
+            'duedate': duedate,
+            'amount': amount if is_paid else None,
+            'paid_date': duedate if is_paid else None,
+            'state': (
+                DebtState.pay
+                if is_paid
+                else DebtState.overdue
+                if duedate < today
+                else DebtState.pending
+            ),
+        })
+
+    return installments
+
+
+def insert_installments(session, installments):
+    # executemany pela tabela: o bulk do ORM quebra o lote a cada mudança
+    # nas colunas nulas (parcelas pagas e em aberto intercaladas)
+    if installments:
+        session.execute(insert(DebtInstallment.__table__), installments)
+
+    summarize_installments(session, installments)
+
+
+def summarize_installments(session, installments):
+    changes = SummaryChanges()
+    for row in installments:
+        changes.add(
+            row['user_id'],
+            row['duedate'],
+            row['state'],
+            row['installmentamount'],
+        )
+    changes.apply(session)
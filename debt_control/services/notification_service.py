@@ -5,36 +5,48 @@ from sqlalchemy import select
 from debt_control.models import Debt, DebtInstallment, DebtState, User
 from debt_control.utils.firebase import send_notification
 
+BATCH_SIZE = 1000
 
-def notify_installments(session):  # pragma: no cover
+
+def notify_installments(session):
     today = datetime.today().date()
     five_days_ahead = today + timedelta(days=5)
 
-    # SQLAlchemy 2.x: session.scalars(select(...)).all()
-    installments = session.scalars(select(DebtInstallment)).all()
-
-    for inst in installments:
-        debt = session.scalar(select(Debt).where(Debt.id == inst.debt_id))
-
-        user = session.get(User, inst.user_id)
-        if not user or not user.fcm_token:
-            continue
+    # uma única consulta pelo índice parcial de parcelas pendentes,
+    # lida em lotes para a memória não crescer com o número de parcelas
+    query = (
+        select(
+            DebtInstallment.number,
+            DebtInstallment.duedate,
+            DebtInstallment.installmentamount,
+            Debt.description,
+            User.fcm_token,
+        )
+        .join(Debt, Debt.id == DebtInstallment.debt_id)
+        .join(User, User.id == DebtInstallment.user_id)
+        .where(
+            DebtInstallment.state == DebtState.pending,
+            DebtInstallment.duedate.in_([today, five_days_ahead]),
+            User.fcm_token.is_not(None),
+        )
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+
+    for inst in session.execute(query):
         # 5 dias antes
-        if inst.state == DebtState.pending and inst.duedate == five_days_ahead:
-            print('5 dias')
+        if inst.duedate == five_days_ahead:
             send_notification(
-                user.fcm_token,
-                f'📅 Parcela da divida {debt.description} a vencer',
+                inst.fcm_token,
+                f'📅 Parcela da divida {inst.description} a vencer',
                 f'Sua parcela nº {inst.number}'
                 + f' vence em 5 dias. Valor: R$ {inst.installmentamount:.2f}',
             )
 
         # no dia
-        if inst.state == DebtState.pending and inst.duedate == today:
-            print(f'Hoje {debt.description}')
+        if inst.duedate == today:
             send_notification(
-                user.fcm_token,
-                f'⚠️ Parcela da divida {debt.description} vence hoje',
+                inst.fcm_token,
+                f'⚠️ Parcela da divida {inst.description} vence hoje',
                 f'Sua parcela nº {inst.number}'
                 + f' vence hoje. Valor: R$ {inst.installmentamount:.2f}',
             )
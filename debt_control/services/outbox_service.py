@@ -0,0 +1,88 @@
+import logging
+
+from sqlalchemy import delete, func, select, update
+
+from debt_control.models import NotificationOutbox
+from debt_control.services.dispatcher import MAX_BATCH_SIZE, Notification
+
+MAX_ATTEMPTS = 5
+RETRY_BACKOFF = 30  # segundos, dobra a cada tentativa
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_at(attempts):
+    # make_interval(years, months, weeks, days, hours, mins, secs)
+    return func.now() + func.make_interval(
+        0, 0, 0, 0, 0, 0, RETRY_BACKOFF * func.power(2, attempts)
+    )
+
+
+def enqueue_notification(session, token: str, title: str, body: str):
+    # gravada na mesma transação da alteração; só sai depois do commit
+    if token:
+        session.add(NotificationOutbox(token=token, title=title, body=body))
+
+
+def relay_outbox(session, transport, batch_size: int = MAX_BATCH_SIZE):
+    relayed = 0
+
+    while True:
+        # SKIP LOCKED deixa vários relays drenarem a fila em paralelo
+        rows = session.scalars(
+            select(NotificationOutbox)
+            .where(NotificationOutbox.next_attempt_at <= func.now())
+            .order_by(NotificationOutbox.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+
+        if not rows:
+            session.commit()
+            return relayed
+
+        notifications = [
+            Notification(token=row.token, title=row.title, body=row.body)
+            for row in rows
+        ]
+        failed = {
+            id(notification) for notification in transport(notifications)
+        }
+
+        failed_rows = [
+            row
+            for row, notification in zip(rows, notifications)
+            if id(notification) in failed
+        ]
+        retry_ids = [
+            row.id for row in failed_rows if row.attempts + 1 < MAX_ATTEMPTS
+        ]
+        # na última tentativa a linha sai da fila sem ter sido entregue
+        dropped = len(failed_rows) - len(retry_ids)
+        done_ids = [row.id for row in rows if row.id not in retry_ids]
+
+        if retry_ids:
+            session.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id.in_(retry_ids))
+                .values(
+                    attempts=NotificationOutbox.attempts + 1,
+                    next_attempt_at=_retry_at(NotificationOutbox.attempts),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        session.execute(
+            delete(NotificationOutbox)
+            .where(NotificationOutbox.id.in_(done_ids))
+            .execution_options(synchronize_session=False)
+        )
+        session.commit()
+        relayed += len(rows) - len(failed_rows)
+
+        if dropped:
+            logger.warning(
+                '%d notificações descartadas após %d tentativas',
+                dropped,
+                MAX_ATTEMPTS,
+            )
@@ -0,0 +1,48 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from debt_control.models import Debt, DebtInstallment, DebtState, JobWatermark
+from debt_control.services.summary_service import SummaryChanges
+
+OVERDUE_JOB = 'overdue_transition'
+
+
+def run_overdue_transition(session, today: date | None = None):
+    today = today or date.today()
+
+    # trava a marca d'água para que só uma execução avance por vez
+    watermark = session.scalar(
+        select(JobWatermark)
+        .where(JobWatermark.name == OVERDUE_JOB)
+        .with_for_update()
+    )
+
+    if watermark and watermark.last_run >= today:
+        session.rollback()
+        return 0
+
+    since = watermark.last_run if watermark else None
+
+    moved = DebtInstallment.update_overdue(session, today, since)
+    debt_ids = {row.debt_id for row in moved}
+    Debt.update_overdue_debts(session, debt_ids, since)
+
+    changes = SummaryChanges()
+    for row in moved:
+        changes.move(
+            row.user_id,
+            row.duedate,
+            DebtState.pending,
+            DebtState.overdue,
+            row.installmentamount,
+        )
+    changes.apply(session)
+
+    if watermark:
+        watermark.last_run = today
+    else:
+        session.add(JobWatermark(name=OVERDUE_JOB, last_run=today))
+
+    session.commit()
+    return len(debt_ids)
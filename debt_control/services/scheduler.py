@@ -1,11 +1,75 @@
+from datetime import datetime
+from threading import Event, Thread
+
 from apscheduler.schedulers.background import BackgroundScheduler
+from sqlalchemy import column, exists, func, select, table
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.orm import Session
 
-from debt_control.database import engine
+from debt_control.database import direct_engine, engine
 from debt_control.services.notification_service import notify_installments
+from debt_control.services.outbox_service import relay_outbox
+from debt_control.services.overdue_service import run_overdue_transition
+from debt_control.utils.firebase import transport
 
+# chave do advisory lock compartilhada por todos os processos da aplicação
+LEADER_LOCK_ID = 7_310_001
+ELECTION_INTERVAL = 60  # segundos entre tentativas dos seguidores
 
-def start_scheduler():  # pragma: no cover
+pg_locks = table(
+    'pg_locks',
+    column('locktype'),
+    column('objid'),
+    column('pid'),
+    column('granted'),
+)
+
+
+def acquire_leadership(bind):
+    # o lock é de sessão: vale enquanto a conexão devolvida ficar aberta
+    connection = bind.connect()
+    leader = connection.scalar(
+        select(func.pg_try_advisory_lock(LEADER_LOCK_ID))
+    )
+    connection.commit()
+
+    if leader:
+        return connection
+
+    connection.close()
+    return None
+
+
+def still_leader(connection):
+    # o lock some junto com a conexão (restart, rede, idle timeout)
+    try:
+        leader = connection.scalar(
+            select(
+                exists().where(
+                    pg_locks.c.locktype == 'advisory',
+                    pg_locks.c.objid == LEADER_LOCK_ID,
+                    pg_locks.c.pid == func.pg_backend_pid(),
+                    pg_locks.c.granted,
+                )
+            )
+        )
+        connection.commit()
+    except DBAPIError:
+        connection.invalidate()
+        return False
+    return leader
+
+
+def release_leadership(connection):
+    # a conexão volta para o pool, então o lock precisa ser liberado antes;
+    # se ela caiu, o Postgres já soltou o lock
+    if not connection.invalidated:
+        connection.scalar(select(func.pg_advisory_unlock(LEADER_LOCK_ID)))
+        connection.commit()
+    connection.close()
+
+
+def create_scheduler():  # pragma: no cover
     scheduler = BackgroundScheduler()
 
     def job_notify():
@@ -15,5 +79,50 @@ def start_scheduler():  # pragma: no cover
         finally:
             session.close()
 
+    def job_overdue():
+        session = Session(engine)
+        try:
+            run_overdue_transition(session)
+        finally:
+            session.close()
+
+    def job_relay():
+        session = Session(engine)
+        try:
+            relay_outbox(session, transport)
+        finally:
+            session.close()
+
     scheduler.add_job(job_notify, 'cron', hour=20, minute=00)
-    scheduler.start()
+    # roda na virada do dia e uma vez ao subir, caso a virada tenha passado
+    scheduler.add_job(
+        job_overdue, 'cron', hour=0, minute=0, next_run_time=datetime.now()
+    )
+    scheduler.add_job(job_relay, 'interval', seconds=5)
+    return scheduler
+
+
+def _run_election(stopped: Event):  # pragma: no cover
+    # só o processo que obtém o lock agenda os jobs; os demais apenas
+    # tentam de novo de tempos em tempos, caso o líder caia
+    while not stopped.is_set():
+        connection = acquire_leadership(direct_engine)
+        if connection:
+            scheduler = create_scheduler()
+            scheduler.start()
+            try:
+                # confere o lock periodicamente; perdido, volta à eleição
+                while not stopped.wait(ELECTION_INTERVAL):
+                    if not still_leader(connection):
+                        break
+            finally:
+                scheduler.shutdown()
+                release_leadership(connection)
+            continue
+        stopped.wait(ELECTION_INTERVAL)
+
+
+def start_scheduler():  # pragma: no cover
+    stopped = Event()
+    Thread(target=_run_election, args=(stopped,), daemon=True).start()
+    return stopped.set
@@ -0,0 +1,200 @@
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from dateutil.relativedelta import relativedelta
+from sqlalchemy import (
+    Date,
+    and_,
+    cast,
+    delete,
+    func,
+    or_,
+    select,
+    union_all,
+)
+from sqlalchemy import text as sql_text
+from sqlalchemy.dialects.postgresql import insert
+
+from debt_control.models import (
+    DebtInstallment,
+    DebtState,
+    UserMonthlySummary,
+)
+
+SUMMARY_COLUMNS = ['user_id', 'month', 'state', 'count', 'total']
+
+STATE_ORDER = {state: order for order, state in enumerate(DebtState)}
+
+
+def _upsert(stmt):
+    # soma o delta à linha existente em vez de sobrescrever
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            UserMonthlySummary.user_id,
+            UserMonthlySummary.month,
+            UserMonthlySummary.state,
+        ],
+        set_={
+            'count': UserMonthlySummary.count + stmt.excluded.count,
+            'total': UserMonthlySummary.total + stmt.excluded.total,
+        },
+    )
+
+
+def _summarize(*criteria, sign: int = 1, period: str = 'month'):
+    month = cast(func.date_trunc(period, DebtInstallment.duedate), Date)
+    return (
+        select(
+            DebtInstallment.user_id,
+            month.label('month'),
+            DebtInstallment.state,
+            (sign * func.count()).label('count'),
+            (sign * func.sum(DebtInstallment.installmentamount)).label(
+                'total'
+            ),
+        )
+        .where(*criteria)
+        .group_by(DebtInstallment.user_id, month, DebtInstallment.state)
+    )
+
+
+def _lock_order(item):
+    # estados na ordem de declaração do enum, a mesma do Postgres
+    (user_id, month, state), _ = item
+    return user_id, month, STATE_ORDER[state]
+
+
+# deltas calculados em memória, gravados num único upsert
+class SummaryChanges:
+    def __init__(self):
+        self._deltas = defaultdict(lambda: [0, Decimal(0)])
+
+    def add(self, user_id, duedate, state, amount, sign: int = 1):
+        delta = self._deltas[user_id, duedate.replace(day=1), state]
+        delta[0] += sign
+        delta[1] += sign * amount
+
+    def move(self, user_id, duedate, old_state, new_state, amount):
+        self.add(user_id, duedate, old_state, amount, sign=-1)
+        self.add(user_id, duedate, new_state, amount)
+
+    def apply(self, session):
+        if self._deltas:
+            # sempre na mesma ordem de chaves, como o ORDER BY do
+            # remove_installments, para duas transações não se travarem
+            session.execute(
+                _upsert(
+                    insert(UserMonthlySummary).values([
+                        dict(zip(SUMMARY_COLUMNS, (*key, count, total)))
+                        for key, (count, total) in sorted(
+                            self._deltas.items(), key=_lock_order
+                        )
+                    ])
+                )
+            )
+            self._deltas.clear()
+
+
+def remove_installments(session, *criteria):
+    # chamar antes de apagar as parcelas que atendem aos critérios
+    session.execute(
+        _upsert(
+            insert(UserMonthlySummary).from_select(
+                SUMMARY_COLUMNS,
+                _summarize(*criteria, sign=-1).order_by(
+                    'user_id', 'month', 'state'
+                ),
+            )
+        )
+    )
+
+
+def rebuild_summary(session):
+    # bloqueia as escritas concorrentes até o commit da reconstrução
+    session.execute(
+        sql_text('LOCK TABLE user_monthly_summary IN SHARE ROW EXCLUSIVE MODE')
+    )
+    session.execute(delete(UserMonthlySummary))
+    session.execute(
+        insert(UserMonthlySummary).from_select(SUMMARY_COLUMNS, _summarize())
+    )
+    session.commit()
+
+
+def period_totals(user_id: int, start: date, end: date, interval: str):
+    # por mês aproveita o resumo; por semana agrupa direto as parcelas
+    if interval == 'month':
+        rows = summary_totals(user_id, start, end)
+    else:
+        rows = _summarize(
+            DebtInstallment.user_id == user_id,
+            DebtInstallment.duedate >= start,
+            DebtInstallment.duedate <= end,
+            period=interval,
+        ).subquery()
+    period = rows.c.month
+
+    return (
+        select(
+            period.label('period'),
+            rows.c.state,
+            func.sum(rows.c.count).label('count'),
+            func.sum(rows.c.total).label('total'),
+        )
+        .group_by(period, rows.c.state)
+        .order_by(period)
+    )
+
+
+def summary_totals(user_id: int, start: date | None, end: date | None):
+    # meses inteiros saem do resumo; só os meses cortados pelo
+    # intervalo são somados a partir das parcelas
+    first = start
+    if start and start.day != 1:
+        first = start.replace(day=1) + relativedelta(months=1)
+    after = end and (end + timedelta(days=1)).replace(day=1)
+
+    installments = _summarize(DebtInstallment.user_id == user_id)
+    if first and after and first >= after:
+        # intervalo dentro de um único mês
+        sources = [
+            installments.where(
+                DebtInstallment.duedate >= start,
+                DebtInstallment.duedate <= end,
+            )
+        ]
+    else:
+        summary = select(
+            UserMonthlySummary.user_id,
+            UserMonthlySummary.month,
+            UserMonthlySummary.state,
+            UserMonthlySummary.count,
+            UserMonthlySummary.total,
+        ).where(UserMonthlySummary.user_id == user_id)
+        if first:
+            summary = summary.where(UserMonthlySummary.month >= first)
+        if after:
+            summary = summary.where(UserMonthlySummary.month < after)
+
+        edges = []
+        if start and start < first:
+            edges.append(
+                and_(
+                    DebtInstallment.duedate >= start,
+                    DebtInstallment.duedate < first,
+                )
+            )
+        if end and after <= end:
+            edges.append(
+                and_(
+                    DebtInstallment.duedate >= after,
+                    DebtInstallment.duedate <= end,
+                )
+            )
+
+        sources = [summary]
+        if edges:
+            sources.append(installments.where(or_(*edges)))
+
+    return union_all(*sources).subquery()
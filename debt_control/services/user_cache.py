@@ -0,0 +1,52 @@
+import logging
+import time
+from threading import Event, Thread
+
+import psycopg
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from debt_control.settings import Settings
+from debt_control.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+settings = Settings()
+
+CHANNEL = 'user_cache'
+
+user_cache = TTLCache(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+async def invalidate_user(session, user_id: int):
+    # chamar depois do commit que alterou ou removeu o usuário
+    user_cache.pop(user_id)
+
+    if settings.USER_CACHE_SHARED:
+        # avisa os outros workers; o NOTIFY só sai no commit
+        await session.execute(select(func.pg_notify(CHANNEL, str(user_id))))
+        await session.commit()
+
+
+def _listen(stopped: Event):  # pragma: no cover
+    url = make_url(settings.direct_url).set(drivername='postgresql')
+    conninfo = url.render_as_string(hide_password=False)
+
+    while not stopped.is_set():
+        try:
+            with psycopg.connect(conninfo, autocommit=True) as connection:
+                connection.execute(f'LISTEN {CHANNEL}')
+                # o que mudou enquanto não estávamos ouvindo
+                user_cache.clear()
+                while not stopped.is_set():
+                    for notify in connection.notifies(timeout=1):
+                        user_cache.pop(int(notify.payload))
+        except psycopg.Error:
+            logger.exception('Conexão de invalidação do cache perdida')
+            time.sleep(1)
+
+
+def start_invalidation_listener():  # pragma: no cover
+    stopped = Event()
+    Thread(target=_listen, args=(stopped,), daemon=True).start()
+    return stopped.set
@@ -1,3 +1,4 @@
+from pydantic import model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,3 +11,43 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    DATABASE_ASYNC: bool = False
+    DATABASE_POOL_SIZE: int = 20
+    DATABASE_MAX_OVERFLOW: int = 20
+    DATABASE_POOL_TIMEOUT: float = 10
+    DATABASE_POOL_RECYCLE: int = 1800
+    DATABASE_POOL_PRE_PING: bool = True
+    DATABASE_STATEMENT_TIMEOUT: int = 0  # ms, 0 desliga
+    # PgBouncer em modo transaction: sem pool local e sem prepared statements
+    DATABASE_PGBOUNCER: bool = False
+    # conexão direta ao Postgres para o que depende de sessão: o advisory
+    # lock do líder e o LISTEN do cache; obrigatória com o PgBouncer
+    DATABASE_DIRECT_URL: str | None = None
+    USER_CACHE_SIZE: int = 10_000
+    USER_CACHE_TTL: float = 60
+    # invalida o cache dos outros workers via LISTEN/NOTIFY do Postgres
+    USER_CACHE_SHARED: bool = False
+
+    # custo do Argon2: tempo (iterações), memória (KiB) e paralelismo
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST: int = 65536
+    ARGON2_PARALLELISM: int = 4
+    # processos dedicados ao hash e quantos pedidos podem esperar na fila
+    HASH_POOL_WORKERS: int = 2
+    HASH_POOL_QUEUE_SIZE: int = 32
+
+    TESTING: bool = False
+
+    @model_validator(mode='after')
+    def check_pgbouncer(self):
+        if self.DATABASE_PGBOUNCER and not self.DATABASE_DIRECT_URL:
+            raise ValueError(
+                'DATABASE_PGBOUNCER requires DATABASE_DIRECT_URL for the '
+                'leader lock and the cache listener'
+            )
+        return self
+
+    @property
+    def direct_url(self):
+        return self.DATABASE_DIRECT_URL or self.DATABASE_URL
@@ -2,7 +2,12 @@ import os
 
 import firebase_admin
 from dotenv import load_dotenv
-from firebase_admin import credentials, messaging
+from firebase_admin import credentials, exceptions, messaging
+
+from debt_control.services.dispatcher import (
+    Notification,
+    NotificationDispatcher,
+)
 
 load_dotenv()
 
@@ -17,15 +22,47 @@ else:
     messaging = None
 
 
-def send_notification(token: str, title: str, body: str):  # pragma: no cover
+def send_each(notifications):  # pragma: no cover
+    messages = [
+        messaging.Message(
+            notification=messaging.Notification(
+                title=notification.title,
+                body=notification.body,
+            ),
+            token=notification.token,
+        )
+        for notification in notifications
+    ]
+
+    try:
+        response = messaging.send_each(messages)
+    except exceptions.FirebaseError:
+        return notifications
+
+    # token inválido ou não registrado não adianta reenviar
+    return [
+        notification
+        for notification, result in zip(notifications, response.responses)
+        if not result.success
+        and not isinstance(
+            result.exception,
+            (messaging.UnregisteredError, exceptions.InvalidArgumentError),
+        )
+    ]
+
+
+def discard(notifications):  # pragma: no cover
+    return []
+
+
+transport = send_each if messaging else discard
+
+dispatcher = NotificationDispatcher(transport)
+
+
+def send_notification(token: str, title: str, body: str):
     if not token:
         return {'error': 'Usuário não possui token registrado'}
 
-    message = messaging.Message(
-        notification=messaging.Notification(
-            title=title,
-            body=body,
-        ),
-        token=token,
-    )
-    return messaging.send(message)
+    # enfileira e retorna na hora; o envio acontece em lote nos workers
+    dispatcher.submit(Notification(token=token, title=title, body=body))
@@ -0,0 +1,18 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from datetime import date
+
+
+def encode_cursor(value: date, id: int) -> str:
+    payload = json.dumps([value.isoformat(), id]).encode()
+    return urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> tuple[date, int]:
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        value, id = json.loads(urlsafe_b64decode(cursor + padding))
+        return date.fromisoformat(value), int(id)
+    except (BinasciiError, TypeError, ValueError) as exc:
+        raise ValueError(f'Invalid cursor: {cursor}') from exc
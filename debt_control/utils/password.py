@@ -0,0 +1,82 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from threading import Lock
+
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from debt_control.settings import Settings
+
+settings = Settings()
+
+pwd_context = PasswordHash((
+    Argon2Hasher(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST,
+        parallelism=settings.ARGON2_PARALLELISM,
+    ),
+))
+
+
+def get_password_hash(password: str):
+    return pwd_context.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str):
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    # devolve também um novo hash quando o custo configurado mudou
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+class PoolOverloaded(Exception):
+    pass
+
+
+# processos dedicados ao Argon2, fora do threadpool das requisições;
+# com workers + queue_size tarefas pendentes, recusa novas na hora
+class HashingPool:
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.queue_size = queue_size
+        self._executor = None
+        self._pending = 0
+        self._lock = Lock()
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.workers + self.queue_size:
+                raise PoolOverloaded
+
+            if self._executor is None:
+                # spawn: os workers não herdam as threads e conexões do app
+                self._executor = ProcessPoolExecutor(
+                    self.workers, mp_context=get_context('spawn')
+                )
+            self._pending += 1
+            return self._executor
+
+    def _release(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    async def run(self, fn, *args):
+        executor = self._acquire()
+        try:
+            future = executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+
+        if executor:
+            executor.shutdown(cancel_futures=True)
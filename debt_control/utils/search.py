@@ -0,0 +1,23 @@
+from sqlalchemy import func, or_
+
+
+def _escape(term: str):
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def search_filter(term: str, *columns):
+    # ILIKE '%termo%' usa os índices GIN trigram das colunas
+    pattern = f'%{_escape(term)}%'
+    return or_(*(column.ilike(pattern, escape='\\') for column in columns))
+
+
+def exact_match(term: str, column):
+    # igualdade sem diferenciar maiúsculas, também pelo índice trigram
+    return column.ilike(_escape(term), escape='\\')
+
+
+def similarity_rank(term: str, *columns):
+    # greatest ignora os NULL, como o de uma dívida sem observação
+    return func.greatest(
+        *(func.similarity(column, term) for column in columns)
+    )
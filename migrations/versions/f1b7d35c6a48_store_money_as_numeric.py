@@ -0,0 +1,55 @@
+"""store money as numeric
+
+Revision ID: f1b7d35c6a48
+Revises: a6c2f49d8e13
+Create Date: 2026-10-17 16:40:18.204377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f1b7d35c6a48'
+down_revision: Union[str, None] = 'a6c2f49d8e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# a conversão arredonda os valores existentes para centavos
+MONEY_COLUMNS = [
+    ('debt', 'value', False),
+    ('debt_installment', 'installmentamount', False),
+    ('debt_installment', 'amount', True),
+    ('user_monthly_summary', 'total', False),
+]
+
+
+def upgrade() -> None:
+    for table, column, nullable in MONEY_COLUMNS:
+        op.alter_column(table, column,
+               existing_type=sa.Float(),
+               type_=sa.Numeric(precision=14, scale=2),
+               existing_nullable=nullable,
+               postgresql_using=f'round({column}::numeric, 2)')
+
+    # o resumo somava floats; recalcula a partir das parcelas já convertidas
+    op.execute('DELETE FROM user_monthly_summary')
+    op.execute(
+        """
+        INSERT INTO user_monthly_summary (user_id, month, state, count, total)
+        SELECT user_id, date_trunc('month', duedate)::date, state,
+               count(*), sum(installmentamount)
+        FROM debt_installment
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    for table, column, nullable in MONEY_COLUMNS:
+        op.alter_column(table, column,
+               existing_type=sa.Numeric(precision=14, scale=2),
+               type_=sa.Float(),
+               existing_nullable=nullable)
@@ -1,17 +1,24 @@
 from contextlib import contextmanager
-from datetime import datetime
+from datetime import date, datetime
 
 import factory
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
 from testcontainers.postgres import PostgresContainer
 
 from debt_control.app import app
-from debt_control.database import get_session
+from debt_control.database import (
+    ThreadedSession,
+    get_session,
+    get_sync_session,
+)
 from debt_control.models import Category, User, table_registry
 from debt_control.security import get_password_hash
+from debt_control.services.user_cache import user_cache
 
 
 @pytest.fixture(scope='session')
@@ -23,13 +30,38 @@ def engine():
             yield _engine
 
 
+@pytest.fixture(autouse=True)
+def clear_user_cache():
+    user_cache.clear()
+
+
 @pytest.fixture
 def client(session):
     def get_session_override():
-        return session
+        return ThreadedSession(session)
+
+    with TestClient(app) as client:
+        app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_sync_session] = lambda: session
+        yield client
+
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def async_client(session, engine):
+    # mesmas rotas usando o AsyncSession de verdade (DATABASE_ASYNC)
+    async_engine = create_async_engine(engine.url, poolclass=NullPool)
+
+    async def get_session_override():
+        async with AsyncSession(
+            async_engine, expire_on_commit=False
+        ) as async_session:
+            yield async_session
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_sync_session] = lambda: session
         yield client
 
     app.dependency_overrides.clear()
@@ -44,6 +76,9 @@ def session(engine):
         session.rollback()
 
     table_registry.metadata.drop_all(engine)
+    # o enum é recriado a cada teste; descarta as conexões com prepared
+    # statements que ainda apontam para o tipo antigo
+    engine.dispose()
 
 
 @contextmanager
@@ -66,6 +101,24 @@ def mock_db_time():
     return _mock_db_time
 
 
+@pytest.fixture
+def count_queries(engine):
+    @contextmanager
+    def _count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+        yield statements
+
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return _count_queries
+
+
 @pytest.fixture
 def user(session):
     password = 'testtest'
@@ -115,6 +168,35 @@ def category(session, user):
     return category
 
 
+@pytest.fixture
+def debts(request, client, token, category):
+    # uma dívida por mês (Debt 1, Debt 2, ...) criada pela API, com
+    # parcelas e resumo mensal; parametrize(..., indirect=True) troca os
+    # campos, e um campo pode ser função do mês
+    fields = dict(getattr(request, 'param', {}))
+    months = fields.pop('months', 3)
+
+    ids = []
+    for month in range(1, months + 1):
+        debt = {
+            'description': f'Debt {month}',
+            'value': 100,
+            'category_id': category.id,
+            'plots': 3,
+            'purchasedate': date(2025, month, 15),
+            'paidinstallments': month - 1,
+        }
+        for name, value in fields.items():
+            debt[name] = value(month) if callable(value) else value
+        debt['purchasedate'] = str(debt['purchasedate'])
+
+        response = client.post(
+            '/debt', headers={'Authorization': f'Bearer {token}'}, json=debt
+        )
+        ids.append(response.json()['id'])
+    return ids
+
+
 class UserFactory(factory.Factory):
     class Meta:
         model = User
@@ -81,3 +81,59 @@ def test_get_current_user_does_not_exists__exercicio(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_async_session_flow(async_client):
+    user = {
+        'username': 'alice',
+        'email': 'alice@example.com',
+        'password': 'secret',
+    }
+    response = async_client.post('/users/', json=user)
+    assert response.status_code == HTTPStatus.CREATED
+
+    token = async_client.post(
+        '/auth/token',
+        data={'username': user['email'], 'password': user['password']},
+    ).json()['access_token']
+    headers = {'Authorization': f'Bearer {token}'}
+
+    category = async_client.post(
+        '/category/', headers=headers, json={'description': 'Casa'}
+    ).json()
+    debt = async_client.post(
+        '/debt/',
+        headers=headers,
+        json={
+            'description': 'Sofá',
+            'value': 300,
+            'category_id': category['id'],
+            'plots': 3,
+            'purchasedate': '2099-01-01',
+            'paidinstallments': 0,
+        },
+    ).json()
+    installments = async_client.get(
+        f'/debt/{debt["id"]}/installments', headers=headers
+    ).json()['debtinstallments']
+
+    response = async_client.patch(
+        f'/debt/{debt["id"]}',
+        headers=headers,
+        json={'plot_ids': [installments[0]['id']], 'amount': None},
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    [listed] = async_client.get('/debt/', headers=headers).json()['debt']
+    assert listed['paid_installments'] == 1
+    assert listed['category'] == 'Casa'
+
+    response = async_client.delete(f'/debt/{debt["id"]}', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_database_metrics(client):
+    response = client.get('/metrics/database')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['sync']['pool'] == 'MeteredQueuePool'
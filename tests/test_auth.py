@@ -1,6 +1,10 @@
 from http import HTTPStatus
 
 from freezegun import freeze_time
+from pwdlib import PasswordHash
+from pwdlib.hashers.argon2 import Argon2Hasher
+
+from debt_control.utils.password import pwd_context
 
 
 def test_get_token(client, user):
@@ -86,3 +90,19 @@ def test_token_expired_dont_refresh(client, user):
         )
         assert response.status_code == HTTPStatus.UNAUTHORIZED
         assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_token_rehashes_outdated_password(client, session, user):
+    outdated = PasswordHash((Argon2Hasher(time_cost=1, memory_cost=8192),))
+    user.password = outdated.hash(user.clean_password)
+    session.commit()
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+    session.refresh(user)
+
+    assert response.status_code == HTTPStatus.OK
+    assert not pwd_context.current_hasher.check_needs_rehash(user.password)
+    assert pwd_context.verify(user.clean_password, user.password)
@@ -0,0 +1,25 @@
+from freezegun import freeze_time
+
+from debt_control.utils.cache import TTLCache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 'A')
+    cache.set('b', 'B')
+    cache.get('a')
+    cache.set('c', 'C')
+
+    assert cache.get('a') == 'A'
+    assert cache.get('b') is None
+    assert cache.get('c') == 'C'
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+
+    with freeze_time('2025-01-01 12:00:00') as frozen:
+        cache.set('a', 1)
+        frozen.tick(61)
+
+        assert cache.get('a') is None
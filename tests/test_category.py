@@ -0,0 +1,97 @@
+from http import HTTPStatus
+
+from debt_control.models import Category
+
+
+def _create_debt(client, token, category_id, value, paid):
+    client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'category_id': category_id,
+            'value': value,
+            'plots': 2,
+            'purchasedate': '2099-01-10',
+            'paidinstallments': paid,
+        },
+    )
+
+
+def test_summary_categories(session, client, user, token, category):
+    other = Category(description='Other', user_id=user.id)
+    session.add(other)
+    session.commit()
+    _create_debt(client, token, category.id, 100, paid=1)
+    _create_debt(client, token, other.id, 400, paid=0)
+
+    response = client.get(
+        '/category/summary?start_date=2099-01-01&end_date=2099-12-31',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    fields = ['id', 'total_debt_value', 'total_pay_value', 'total_pending']
+    assert [
+        {field: summary[field] for field in fields}
+        for summary in response.json()['categories']
+    ] == [
+        {
+            'id': other.id,
+            'total_debt_value': 400.0,
+            'total_pay_value': 0.0,
+            'total_pending': 2,
+        },
+        {
+            'id': category.id,
+            'total_debt_value': 100.0,
+            'total_pay_value': 50.0,
+            'total_pending': 1,
+        },
+    ]
+
+
+def test_summary_categories_outside_window(client, token, category):
+    _create_debt(client, token, category.id, 100, paid=0)
+
+    response = client.get(
+        '/category/summary?start_date=2098-01-01&end_date=2098-12-31',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json() == {'categories': []}
+
+
+def test_list_categories_search(session, client, user, token, category):
+    session.add_all([
+        Category(description='Casa', user_id=user.id),
+        Category(description='Minha casa nova', user_id=user.id),
+    ])
+    session.commit()
+
+    response = client.get(
+        '/category/?description=CASA&rank=true',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [item['description'] for item in response.json()['categories']] == [
+        'Casa',
+        'Minha casa nova',
+    ]
+
+
+def test_create_category_duplicate_ignores_case(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    duplicate = client.post(
+        '/category/', headers=headers, json={'description': 'fixture CATEGORY'}
+    )
+    # antes o contains recusava qualquer descrição contida em outra
+    partial = client.post(
+        '/category/', headers=headers, json={'description': 'Fixture'}
+    )
+
+    assert duplicate.status_code == HTTPStatus.BAD_REQUEST
+    assert duplicate.json() == {'detail': 'category already exists'}
+    assert partial.status_code == HTTPStatus.OK
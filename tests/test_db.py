@@ -1,8 +1,20 @@
+import asyncio
 from dataclasses import asdict
 
-from sqlalchemy import select
-
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool
+
+from debt_control.database import (
+    configure_engine,
+    engine_options,
+    get_session,
+    pool_status,
+)
 from debt_control.models import Category, Debt, User
+from debt_control.settings import Settings
 
 
 def test_create_user(session, mock_db_time):
@@ -24,6 +36,7 @@ def test_create_user(session, mock_db_time):
         'password': 'secret',
         'email': 'teste@test',
         'fcm_token': None,
+        'token_version': 0,
         'categories': [],
         'debt_installments': [],
         'created_at': time,
@@ -73,3 +86,73 @@ def test_create_debt(session, user: User):
     db_user = session.scalar(select(User).where(User.id == user.id))
 
     assert debt in db_user.debts
+
+
+def test_engine_options_pgbouncer():
+    options = engine_options(
+        Settings(
+            DATABASE_PGBOUNCER=True,
+            DATABASE_DIRECT_URL='postgresql+psycopg://direct/db',
+            DATABASE_STATEMENT_TIMEOUT=1000,
+        )
+    )
+
+    assert options['poolclass'] is NullPool
+    assert options['connect_args'] == {'prepare_threshold': None}
+
+
+def test_pgbouncer_requires_direct_url():
+    with pytest.raises(ValidationError, match='DATABASE_DIRECT_URL'):
+        Settings(DATABASE_PGBOUNCER=True)
+
+
+def test_pgbouncer_statement_timeout_per_transaction(engine):
+    settings = Settings(
+        DATABASE_PGBOUNCER=True,
+        DATABASE_DIRECT_URL=engine.url.render_as_string(),
+        DATABASE_STATEMENT_TIMEOUT=1000,
+    )
+    bouncer = configure_engine(
+        create_engine(engine.url, **engine_options(settings)), settings
+    )
+
+    with bouncer.connect() as connection:
+        # aplicado de novo em cada transação, sem parâmetro de conexão
+        assert connection.scalar(text('SHOW statement_timeout')) == '1s'
+        connection.commit()
+        assert connection.scalar(text('SHOW statement_timeout')) == '1s'
+    bouncer.dispose()
+
+
+def test_metered_pool_records_checkouts_and_timeouts(engine):
+    settings = Settings(
+        DATABASE_POOL_SIZE=1,
+        DATABASE_MAX_OVERFLOW=0,
+        DATABASE_POOL_TIMEOUT=0.1,
+        DATABASE_STATEMENT_TIMEOUT=1000,
+    )
+    metered = create_engine(engine.url, **engine_options(settings))
+
+    with metered.connect() as connection:
+        assert connection.scalar(text('SHOW statement_timeout')) == '1s'
+        with pytest.raises(PoolTimeoutError):
+            metered.connect()
+
+    status = pool_status(metered)
+    metered.dispose()
+
+    assert status['checkouts'] == 1
+    assert status['timeouts'] == 1
+    assert status['wait_max_ms'] >= settings.DATABASE_POOL_TIMEOUT * 1000
+
+
+def test_threaded_session_does_not_expire_on_commit():
+    async def first_session():
+        sessions = get_session()
+        session = await sessions.__anext__()
+        await sessions.aclose()
+        return session
+
+    session = asyncio.run(first_session())
+
+    assert session.sync_session.expire_on_commit is False
@@ -1,11 +1,18 @@
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
 import factory.fuzzy
+import pytest
+from sqlalchemy import select
 
 # ...
-from debt_control.models import Debt, DebtState
+from debt_control.models import (
+    Debt,
+    DebtInstallment,
+    DebtState,
+    NotificationOutbox,
+)
 
 start_date = datetime.now(tz=ZoneInfo('UTC')).date().replace(day=1)
 end_date = (start_date.replace(day=28) + timedelta(days=4)).replace(
@@ -26,7 +33,7 @@ def test_create_debt(client, token, mock_db_time, category):
                 'value': 255,
                 'category_id': category.id,
                 'plots': 1,
-                'purchasedate': str(start_date),
+                'purchasedate': str(end_date),
                 'state': 'pending',
                 'note': None,
                 'paidinstallments': None,
@@ -39,7 +46,7 @@ def test_create_debt(client, token, mock_db_time, category):
         'category_id': category.id,
         'value': 255.0,
         'plots': 1,
-        'purchasedate': str(start_date),
+        'purchasedate': str(end_date),
         'state': 'pending',
         'note': None,
         'created_at': time.isoformat(),
@@ -60,7 +67,7 @@ def test_create_debt_should_return_2_plots(
                 'value': 255,
                 'category_id': category.id,
                 'plots': 2,
-                'purchasedate': str(start_date),
+                'purchasedate': str(end_date),
                 'state': 'pending',
                 'note': None,
                 'paidinstallments': 0,
@@ -73,7 +80,7 @@ def test_create_debt_should_return_2_plots(
         'category_id': category.id,
         'value': 255.0,
         'plots': 2,
-        'purchasedate': str(start_date),
+        'purchasedate': str(end_date),
         'state': 'pending',
         'note': None,
         'created_at': time.isoformat(),
@@ -146,6 +153,58 @@ def test_list_debt_filter_description_should_return_5_debt(
     assert len(response.json()['debt']) == expected_debts
 
 
+def test_list_debt_search_ignores_case_and_matches_note(
+    session, user, client, token, category
+):
+    session.add_all([
+        DebtFactory(user_id=user.id, description='Mercado do mês'),
+        DebtFactory(user_id=user.id, description='Feira', note='MERCADO'),
+        DebtFactory(user_id=user.id, description='Cinema'),
+        DebtFactory(user_id=user.id, description='100% à vista'),
+    ])
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/debt/?description=mercado', headers=headers)
+    escaped = client.get('/debt/?description=0%25', headers=headers)
+
+    assert {debt['description'] for debt in response.json()['debt']} == {
+        'Mercado do mês',
+        'Feira',
+    }
+    assert [debt['description'] for debt in escaped.json()['debt']] == [
+        '100% à vista'
+    ]
+
+
+def test_list_debt_ranked_by_similarity(
+    session, user, client, token, category
+):
+    session.add_all([
+        DebtFactory(user_id=user.id, description='Conta de luz atrasada'),
+        DebtFactory(user_id=user.id, description='Luz'),
+    ])
+    session.commit()
+
+    response = client.get(
+        '/debt/?description=luz&rank=true&limit=1',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [debt['description'] for debt in response.json()['debt']] == ['Luz']
+    assert response.json()['next_cursor'] is None
+
+
+def test_list_debt_ranked_rejects_cursor(client, token):
+    response = client.get(
+        '/debt/?description=luz&rank=true&cursor=invalid',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Cursor cannot be combined with rank'}
+
+
 def test_list_debt_filter_state_should_return_5_debt(
     session, user, client, token, category
 ):
@@ -196,6 +255,165 @@ def test_list_debt_filter_combined_should_return_5_debt(
     assert len(response.json()['debt']) == expected_debts
 
 
+def test_list_debt_paid_installments_and_category(client, token, category):
+    client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'value': 300,
+            'category_id': category.id,
+            'plots': 3,
+            'purchasedate': str(start_date),
+            'paidinstallments': 2,
+        },
+    )
+
+    response = client.get(
+        '/debt/',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    expected_paid_installments = 2
+    [debt] = response.json()['debt']
+    assert debt['paid_installments'] == expected_paid_installments
+    assert debt['category'] == category.description
+
+
+def test_list_debt_query_count_does_not_grow_with_page(
+    client, token, category, count_queries
+):
+    def list_debt_statements(total):
+        for _ in range(total):
+            client.post(
+                '/debt',
+                headers={'Authorization': f'Bearer {token}'},
+                json={
+                    'description': 'Test debt description',
+                    'value': 100,
+                    'category_id': category.id,
+                    'plots': 2,
+                    'purchasedate': str(start_date),
+                    'paidinstallments': 1,
+                },
+            )
+
+        with count_queries() as statements:
+            client.get('/debt/', headers={'Authorization': f'Bearer {token}'})
+        return len(statements)
+
+    assert list_debt_statements(1) == list_debt_statements(10)
+
+
+def test_list_debt_keyset_pagination_is_globally_ordered(
+    session, user, client, token, category
+):
+    expected_debts = 7
+    session.bulk_save_objects(
+        DebtFactory.create_batch(expected_debts, user_id=user.id)
+    )
+    session.commit()
+
+    debts = []
+    params = {'limit': 3}
+    while True:
+        response = client.get(
+            '/debt/',
+            params=params,
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        debts += response.json()['debt']
+        if not response.json()['next_cursor']:
+            break
+        params['cursor'] = response.json()['next_cursor']
+
+    keys = [(debt['purchasedate'], debt['id']) for debt in debts]
+    assert len(keys) == expected_debts
+    assert keys == sorted(set(keys))
+
+
+def test_list_debt_invalid_cursor(client, token):
+    response = client.get(
+        '/debt/?cursor=invalid',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+def test_list_installments_keyset_pagination(client, token, category):
+    debt = client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'value': 400,
+            'category_id': category.id,
+            'plots': 4,
+            'purchasedate': str(start_date),
+            'paidinstallments': 0,
+        },
+    ).json()
+
+    first = client.get(
+        f'/debt/{debt["id"]}/installments?limit=2',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+    second = client.get(
+        f'/debt/{debt["id"]}/installments?limit=2'
+        f'&cursor={first["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()
+
+    numbers = [
+        installment['number']
+        for installment in first['debtinstallments']
+        + second['debtinstallments']
+    ]
+    assert numbers == [1, 2, 3, 4]
+
+
+def test_patch_debt_writes_notifications_to_outbox(
+    session, client, user, token, category
+):
+    user.fcm_token = 'fcm-token'
+    session.commit()
+
+    debt = client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'value': 200,
+            'category_id': category.id,
+            'plots': 2,
+            'purchasedate': str(start_date),
+            'paidinstallments': 0,
+        },
+    ).json()
+    installments = client.get(
+        f'/debt/{debt["id"]}/installments',
+        headers={'Authorization': f'Bearer {token}'},
+    ).json()['debtinstallments']
+
+    response = client.patch(
+        f'/debt/{debt["id"]}',
+        json={
+            'plot_ids': [i['id'] for i in installments],
+            'amount': None,
+        },
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    outbox = session.scalars(select(NotificationOutbox.body)).all()
+    assert response.json() == {'message': 'paid installments'}
+    assert outbox == [
+        'Sua parcela nº 1 da divida Test debt description foi paga',
+        'Sua parcela nº 2 da divida Test debt description foi paga',
+    ]
+
+
 def test_patch_debt_error(client, token):
     response = client.patch(
         '/debt/100',
@@ -355,3 +573,433 @@ def test_list_dashboard_filter_end_date(client, token, category):
 
 #     assert result.total_overdue_value == float(1)
 #     assert result.total_overdue == float(1)
+
+
+def test_dashboard_totals_are_not_truncated_by_page(client, token, category):
+    expected_total = 120
+    expected_pay = 2
+    expected_value = 1200.0
+    client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': expected_value,
+            'plots': expected_total,
+            'purchasedate': str(end_date),
+            'paidinstallments': expected_pay,
+        },
+    )
+
+    response = client.get(
+        f'/debt/dashboard/?start_date={start_date}&end_date=2099-12-31',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    data = response.json()
+    assert data['total_debt'] == expected_total
+    assert data['total_debt_value'] == expected_value
+    assert data['total_pay'] == expected_pay
+    assert data['total_pending'] == expected_total - expected_pay
+
+
+def test_dashboard_series_by_month(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 300,
+            'plots': 3,
+            'purchasedate': '2099-01-15',
+            'paidinstallments': 1,
+        },
+    )
+
+    response = client.get(
+        '/debt/dashboard/series/?start_date=2099-01-01&end_date=2099-12-31',
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'interval': 'month',
+        'periods': ['2099-01-01', '2099-02-01', '2099-03-01'],
+        'states': {
+            'pay': {'count': [1, 0, 0], 'value': [100.0, 0.0, 0.0]},
+            'pending': {'count': [0, 1, 1], 'value': [0.0, 100.0, 100.0]},
+        },
+    }
+
+
+def test_dashboard_series_by_week(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 200,
+            'plots': 2,
+            'purchasedate': '2099-01-15',
+            'paidinstallments': 0,
+        },
+    )
+
+    response = client.get(
+        '/debt/dashboard/series/?start_date=2099-01-01'
+        '&end_date=2099-01-31&interval=week',
+        headers=headers,
+    )
+
+    assert response.json() == {
+        'interval': 'week',
+        'periods': ['2099-01-12'],
+        'states': {'pending': {'count': [1], 'value': [100.0]}},
+    }
+
+
+def test_dashboard_series_invalid_range(client, token):
+    response = client.get(
+        '/debt/dashboard/series/?start_date=2099-02-01&end_date=2099-01-01',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize(
+    ('value', 'expected_value'),
+    [(10.123, 10.12), (0.1 + 0.2, 0.3), ('19.999', 20.0)],
+)
+def test_create_debt_rounds_value_to_cents(
+    client, token, category, value, expected_value
+):
+    response = client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': value,
+            'plots': 1,
+            'purchasedate': str(end_date),
+            'paidinstallments': 0,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['value'] == expected_value
+
+
+def test_create_debt_rejects_invalid_value(client, token, category):
+    response = client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 'abc',
+            'plots': 1,
+            'purchasedate': str(end_date),
+            'paidinstallments': 0,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize('amount', [True, 1, 100.5, None])
+def test_patch_debt_accepts_amount_flag(client, token, category, amount):
+    headers = {'Authorization': f'Bearer {token}'}
+    debt = client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 200,
+            'plots': 2,
+            'purchasedate': '2099-01-01',
+            'paidinstallments': 0,
+        },
+    ).json()
+    [installment, _] = client.get(
+        f'/debt/{debt["id"]}/installments', headers=headers
+    ).json()['debtinstallments']
+
+    response = client.patch(
+        f'/debt/{debt["id"]}',
+        headers=headers,
+        json={'plot_ids': [installment['id']], 'amount': amount},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_dashboard_sums_money_exactly(client, token, category):
+    expected_value = 0.3
+    headers = {'Authorization': f'Bearer {token}'}
+    for _ in range(3):
+        client.post(
+            '/debt',
+            headers=headers,
+            json={
+                'description': 'Test debt description',
+                'category_id': category.id,
+                'value': 0.1,
+                'plots': 1,
+                'purchasedate': str(start_date),
+                'paidinstallments': 0,
+            },
+        )
+
+    response = client.get(
+        f'/debt/dashboard/?start_date={start_date}&end_date={end_date}',
+        headers=headers,
+    )
+
+    assert response.json()['total_debt_value'] == expected_value
+
+
+def test_patch_debt_pays_in_two_statements(
+    session, client, token, category, count_queries
+):
+    plots = 48
+    headers = {'Authorization': f'Bearer {token}'}
+    debt = client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 4800,
+            'plots': plots,
+            'purchasedate': '2099-01-01',
+            'paidinstallments': 0,
+        },
+    ).json()
+    installments = client.get(
+        f'/debt/{debt["id"]}/installments?limit={plots}', headers=headers
+    ).json()['debtinstallments']
+
+    with count_queries() as statements:
+        response = client.patch(
+            f'/debt/{debt["id"]}',
+            json={'plot_ids': [i['id'] for i in installments], 'amount': 100},
+            headers=headers,
+        )
+
+    payment = [
+        statement.split()[0:3]
+        for statement in statements
+        if 'debt_installment' in statement
+        or statement.startswith('UPDATE debt ')
+    ]
+    db_debt = session.scalar(select(Debt).where(Debt.id == debt['id']))
+
+    assert response.status_code == HTTPStatus.OK
+    assert payment == [
+        ['WITH', 'payable', 'AS'],
+        ['UPDATE', 'debt', 'SET'],
+    ]
+    assert db_debt.state == DebtState.pay
+
+
+def test_patch_debt_installment_not_found(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+    debt = client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 200,
+            'plots': 2,
+            'purchasedate': '2099-01-01',
+            'paidinstallments': 1,
+        },
+    ).json()
+
+    response = client.patch(
+        f'/debt/{debt["id"]}',
+        json={'plot_ids': [1, 2], 'amount': None},
+        headers=headers,
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'One or more installments not found.'}
+
+
+def _create_debts(client, headers, category, count):
+    return [
+        client.post(
+            '/debt',
+            headers=headers,
+            json={
+                'description': f'Debt {number}',
+                'category_id': category.id,
+                'value': 200,
+                'plots': 2,
+                'purchasedate': '2099-01-10',
+                'paidinstallments': 0,
+            },
+        ).json()['id']
+        for number in range(count)
+    ]
+
+
+def test_pay_installments_by_due_date(session, client, user, token, category):
+    user.fcm_token = 'fcm-token'
+    session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    debt_ids = _create_debts(client, headers, category, 3)
+
+    response = client.post(
+        '/debt/installments/pay',
+        headers=headers,
+        json={'start_date': '2099-01-01', 'end_date': '2099-01-31'},
+    )
+
+    outbox = session.scalars(select(NotificationOutbox.body)).all()
+    states = session.scalars(select(Debt.state).order_by(Debt.id)).all()
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'paid': 3,
+        'total': 300.0,
+        'debts': debt_ids,
+    }
+    assert outbox == ['3 parcelas de 3 dívidas foram pagas (R$ 300.00)']
+    assert states == [DebtState.pending] * 3
+
+
+def test_pay_installments_by_ids_across_debts(
+    session, client, token, category
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    debt_ids = _create_debts(client, headers, category, 2)
+    plot_ids = session.scalars(
+        select(DebtInstallment.id).where(DebtInstallment.debt_id.in_(debt_ids))
+    ).all()
+
+    response = client.post(
+        '/debt/installments/pay',
+        headers=headers,
+        json={'plot_ids': plot_ids, 'amount': 100},
+    )
+
+    states = session.scalars(select(Debt.state)).all()
+
+    assert response.json()['paid'] == len(plot_ids)
+    assert states == [DebtState.pay] * 2
+
+
+def test_pay_installments_empty_ids_uses_due_date(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+    debt_ids = _create_debts(client, headers, category, 2)
+
+    response = client.post(
+        '/debt/installments/pay',
+        headers=headers,
+        json={
+            'plot_ids': [],
+            'start_date': '2099-01-01',
+            'end_date': '2099-01-31',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['paid'] == len(debt_ids)
+
+
+def test_pay_installments_not_found(client, token, category):
+    headers = {'Authorization': f'Bearer {token}'}
+    _create_debts(client, headers, category, 1)
+
+    response = client.post(
+        '/debt/installments/pay',
+        headers=headers,
+        json={'plot_ids': [1, 100]},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert response.json() == {'detail': 'One or more installments not found.'}
+
+
+def test_pay_installments_requires_selection(client, token):
+    response = client.post(
+        '/debt/installments/pay',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'start_date': '2099-01-01'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.parametrize('bulk', [False, True])
+def test_paying_pending_keeps_debt_overdue(
+    session, client, token, category, bulk
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    debt_id = client.post(
+        '/debt',
+        headers=headers,
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 300,
+            'plots': 3,
+            'purchasedate': str(date.today() - timedelta(days=15)),
+            'paidinstallments': 0,
+        },
+    ).json()['id']
+    pending = session.scalars(
+        select(DebtInstallment.id).where(
+            DebtInstallment.debt_id == debt_id,
+            DebtInstallment.state == DebtState.pending,
+        )
+    ).all()
+
+    if bulk:
+        response = client.post(
+            '/debt/installments/pay',
+            headers=headers,
+            json={'plot_ids': pending},
+        )
+    else:
+        response = client.patch(
+            f'/debt/{debt_id}',
+            headers=headers,
+            json={'plot_ids': pending, 'amount': None},
+        )
+
+    session.expire_all()
+    expected_pending = 2
+    assert response.status_code == HTTPStatus.OK
+    assert len(pending) == expected_pending
+    assert session.get(Debt, debt_id).state == DebtState.overdue
+
+
+def test_create_debt_with_past_due_installment_is_overdue(
+    session, client, token, category
+):
+    response = client.post(
+        '/debt',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'description': 'Test debt description',
+            'category_id': category.id,
+            'value': 300,
+            'plots': 3,
+            'purchasedate': str(date.today() - timedelta(days=45)),
+            'paidinstallments': 1,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['state'] == DebtState.overdue
@@ -0,0 +1,50 @@
+from debt_control.services.dispatcher import (
+    MAX_BATCH_SIZE,
+    FakeTransport,
+    Notification,
+    NotificationDispatcher,
+)
+
+
+def _notifications(total):
+    return [
+        Notification(token=f'token-{n}', title='title', body='body')
+        for n in range(total)
+    ]
+
+
+def test_dispatcher_sends_in_batches():
+    total = 1200
+    transport = FakeTransport()
+    dispatcher = NotificationDispatcher(transport, workers=2)
+
+    for notification in _notifications(total):
+        dispatcher.submit(notification)
+    dispatcher.stop()
+
+    assert len(transport.sent) == total
+    assert set(transport.sent) == set(_notifications(total))
+    assert all(len(batch) <= MAX_BATCH_SIZE for batch in transport.batches)
+
+
+def test_dispatcher_retries_failed_batch():
+    transport = FakeTransport(failures=2)
+    dispatcher = NotificationDispatcher(transport, workers=1, backoff=0)
+
+    for notification in _notifications(3):
+        dispatcher.submit(notification)
+    dispatcher.stop()
+
+    assert transport.sent == _notifications(3)
+
+
+def test_dispatcher_gives_up_after_max_retries():
+    transport = FakeTransport(failures=10)
+    dispatcher = NotificationDispatcher(
+        transport, workers=1, max_retries=2, backoff=0
+    )
+
+    dispatcher.submit(_notifications(1)[0])
+    dispatcher.stop()
+
+    assert transport.sent == []
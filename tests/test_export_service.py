@@ -0,0 +1,87 @@
+import csv
+import io
+import json
+from http import HTTPStatus
+
+import pytest
+
+from debt_control.services import export_service
+
+# Debt 1 com uma parcela paga, Debt 2 com duas e Debt 3 quitada
+pytestmark = pytest.mark.parametrize(
+    'debts',
+    [
+        {
+            'paidinstallments': lambda month: month,
+            'note': {1: 'parcelado, sem juros'}.get,
+        }
+    ],
+    indirect=True,
+)
+
+
+@pytest.mark.usefixtures('debts')
+@pytest.mark.parametrize('client_fixture', ['client', 'async_client'])
+def test_export_csv(request, token, client_fixture, monkeypatch):
+    # lotes pequenos para passar por várias partições do cursor
+    monkeypatch.setattr(export_service, 'EXPORT_BATCH', 2)
+    client = request.getfixturevalue(client_fixture)
+
+    response = client.get(
+        '/debt/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    expected_rows = 9
+    assert len(rows) == expected_rows
+    assert [(row['description'], row['number']) for row in rows[:4]] == [
+        ('Debt 1', '1'),
+        ('Debt 1', '2'),
+        ('Debt 1', '3'),
+        ('Debt 2', '1'),
+    ]
+    assert rows[0]['category'] == 'Fixture Category'
+    assert rows[0]['note'] == 'parcelado, sem juros'
+    assert rows[0]['installmentamount'] == '33.34'
+    assert rows[0]['debt_state'] == 'overdue'
+    assert rows[3]['state'] == 'pay'
+
+
+@pytest.mark.usefixtures('debts')
+def test_export_ndjson_by_state(client, token):
+    response = client.get(
+        '/debt/export?format=ndjson&state=overdue',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    expected_rows = 6
+    expected_value = 100.0
+    assert len(rows) == expected_rows
+    assert {row['description'] for row in rows} == {'Debt 1', 'Debt 2'}
+    assert rows[0]['value'] == expected_value
+    assert rows[0]['purchasedate'] == '2025-01-15'
+
+
+@pytest.mark.usefixtures('debts')
+def test_export_only_current_user(client, other_user):
+    response = client.post(
+        '/auth/token',
+        data={
+            'username': other_user.email,
+            'password': other_user.clean_password,
+        },
+    )
+    token = response.json()['access_token']
+
+    response = client.get(
+        '/debt/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.text.splitlines() == [
+        ','.join(export_service.EXPORT_COLUMNS)
+    ]
@@ -0,0 +1,140 @@
+from datetime import date
+from decimal import Decimal
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import func, select
+
+from debt_control.models import Category, Debt, DebtInstallment, DebtState
+from debt_control.services.import_service import (
+    InvalidImportLine,
+    import_debts,
+    parse_csv,
+    parse_ofx,
+)
+
+CSV = (
+    b'\xef\xbb\xbfdescription,category,value,plots,purchasedate,'
+    b'paidinstallments,note\n'
+    b'Notebook,Fixture Category,3000.00,3,2025-01-10,1,\n'
+    b'Mercado,Casa,250.40,,2025-02-05,,semanal\n'
+)
+
+OFX = b"""OFXHEADER:100
+DATA:OFXSGML
+CHARSET:1252
+
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20250312100000[-3:BRT]
+<TRNAMT>-89,90
+<NAME>Farm\xe1cia
+<MEMO>Compra no d\xe9bito
+</STMTTRN>
+<STMTTRN>
+<TRNTYPE>CREDIT
+<DTPOSTED>20250315
+<TRNAMT>1500.00
+<MEMO>Sal\xe1rio
+</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+def test_parse_csv():
+    rows = list(parse_csv(CSV.splitlines(keepends=True)))
+
+    assert [row.description for row in rows] == ['Notebook', 'Mercado']
+    assert rows[0].value == Decimal('3000.00')
+    assert rows[0].paidinstallments == 1
+    assert rows[1].plots == 1
+    assert rows[1].note == 'semanal'
+
+
+def test_parse_csv_reports_invalid_line():
+    lines = CSV.splitlines(keepends=True) + [b'Luz,Casa,-10,1,2025-02-01\n']
+
+    with pytest.raises(InvalidImportLine, match='Invalid line 4: value'):
+        list(parse_csv(lines))
+
+
+def test_parse_ofx_keeps_only_debits():
+    rows = list(parse_ofx(OFX.splitlines(keepends=True)))
+
+    assert len(rows) == 1
+    assert rows[0].description == 'Farmácia'
+    assert rows[0].note == 'Compra no débito'
+    assert rows[0].value == Decimal('89.90')
+    assert rows[0].purchasedate == date(2025, 3, 12)
+    assert rows[0].category == 'Importados'
+
+
+def test_import_debts_in_chunks(session, user, category):
+    rows = parse_csv(CSV.splitlines(keepends=True))
+
+    summary = import_debts(session, user.id, rows, chunk_size=1)
+    session.commit()
+
+    assert summary == {'debts': 2, 'installments': 4, 'categories': 1}
+    debts = session.scalars(select(Debt).order_by(Debt.id)).all()
+    assert [debt.category_id for debt in debts][0] == category.id
+    # compras passadas com parcelas em aberto já entram vencidas
+    assert debts[0].state == DebtState.overdue
+    assert debts[1].state == DebtState.overdue
+    assert session.scalar(
+        select(func.count()).where(Category.user_id == user.id)
+    ) == len(['Fixture Category', 'Casa'])
+    assert session.scalar(
+        select(func.sum(DebtInstallment.installmentamount)).where(
+            DebtInstallment.debt_id == debts[0].id
+        )
+    ) == Decimal('3000.00')
+
+
+@pytest.mark.parametrize('client_fixture', ['client', 'async_client'])
+def test_import_endpoint(request, session, token, client_fixture):
+    client = request.getfixturevalue(client_fixture)
+    response = client.post(
+        '/debt/import',
+        headers={'Authorization': f'Bearer {token}'},
+        files={'file': ('extrato.ofx', OFX)},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'debts': 1, 'installments': 1, 'categories': 1}
+
+
+def test_import_endpoint_rejects_invalid_line(session, client, token):
+    response = client.post(
+        '/debt/import',
+        headers={'Authorization': f'Bearer {token}'},
+        files={'file': ('dividas.csv', CSV + b'Luz,,10,1,2025-02-01\n')},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'].startswith('Invalid line 4: category')
+    assert session.scalar(select(func.count()).select_from(Debt)) == 0
+
+
+def test_import_debts_matches_categories_ignoring_case(
+    session, user, category
+):
+    csv = (
+        b'description,category,value,purchasedate\n'
+        b'Luz,fixture CATEGORY,80,2099-01-05\n'
+        b'Sofa,Sala,900,2099-01-06\n'
+        b'Mesa,SALA,400,2099-01-07\n'
+    )
+
+    summary = import_debts(
+        session, user.id, parse_csv(csv.splitlines(keepends=True))
+    )
+
+    categories = session.scalars(
+        select(Category.description)
+        .where(Category.user_id == user.id)
+        .order_by(Category.id)
+    ).all()
+    assert summary['categories'] == 1
+    assert categories == ['Fixture Category', 'Sala']
@@ -0,0 +1,61 @@
+from datetime import date
+from decimal import Decimal
+
+from debt_control.models import Debt, DebtState
+from debt_control.services.installment_service import (
+    build_installments,
+    initial_state,
+    split_value,
+)
+
+
+def test_split_value_sums_exactly():
+    value = Decimal(100)
+    installments = split_value(value, 3)
+
+    assert installments == [
+        Decimal('33.34'),
+        Decimal('33.33'),
+        Decimal('33.33'),
+    ]
+    assert sum(installments) == value
+
+
+def test_build_installments_schedule():
+    debt = Debt(
+        description='Test debt',
+        value=1000,
+        plots=360,
+        purchasedate=date(2025, 1, 31),
+        state=DebtState.pending,
+        note=None,
+        user_id=1,
+        category_id=1,
+    )
+    debt.id = 1
+
+    installments = build_installments(debt, paid=1, today=date(2025, 3, 1))
+
+    assert len(installments) == int(debt.plots)
+    assert [i['duedate'] for i in installments[:3]] == [
+        date(2025, 1, 31),
+        date(2025, 2, 28),
+        date(2025, 3, 31),
+    ]
+    assert [i['state'] for i in installments[:3]] == [
+        DebtState.pay,
+        DebtState.overdue,
+        DebtState.pending,
+    ]
+    assert round(sum(i['installmentamount'] for i in installments), 2) == (
+        debt.value
+    )
+
+
+def test_initial_state_follows_first_open_installment():
+    today = date(2025, 3, 15)
+    purchasedate = date(2025, 1, 20)
+
+    assert initial_state(purchasedate, 3, 3, today) == DebtState.pay
+    assert initial_state(purchasedate, 3, 1, today) == DebtState.overdue
+    assert initial_state(purchasedate, 3, 2, today) == DebtState.pending
@@ -0,0 +1,37 @@
+from datetime import date, timedelta
+
+from debt_control.models import Debt, DebtState
+from debt_control.services import notification_service
+from debt_control.services.installment_service import (
+    build_installments,
+    insert_installments,
+)
+
+
+def test_notify_installments(session, user, category, monkeypatch):
+    sent = []
+    monkeypatch.setattr(
+        notification_service,
+        'send_notification',
+        lambda token, title, body: sent.append((token, title)),
+    )
+    user.fcm_token = 'fcm-token'
+
+    debt = Debt(
+        description='Test debt',
+        value=300,
+        plots=3,
+        purchasedate=date.today() + timedelta(days=5),
+        state=DebtState.pending,
+        note=None,
+        user_id=user.id,
+        category_id=category.id,
+    )
+    session.add(debt)
+    session.flush()
+    insert_installments(session, build_installments(debt, paid=0))
+    session.commit()
+
+    notification_service.notify_installments(session)
+
+    assert sent == [('fcm-token', '📅 Parcela da divida Test debt a vencer')]
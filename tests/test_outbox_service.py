@@ -0,0 +1,70 @@
+import logging
+
+from sqlalchemy import select, update
+
+from debt_control.models import NotificationOutbox
+from debt_control.services.dispatcher import FakeTransport, Notification
+from debt_control.services.outbox_service import (
+    MAX_ATTEMPTS,
+    enqueue_notification,
+    relay_outbox,
+)
+
+
+def test_enqueue_notification_skips_missing_token(session):
+    enqueue_notification(session, None, 'title', 'body')
+    session.commit()
+
+    assert session.scalars(select(NotificationOutbox)).all() == []
+
+
+def test_relay_outbox_sends_and_deletes(session):
+    expected_sent = 3
+    for n in range(expected_sent):
+        enqueue_notification(session, f'token-{n}', 'title', 'body')
+    session.commit()
+
+    transport = FakeTransport()
+
+    assert relay_outbox(session, transport, batch_size=2) == expected_sent
+    assert transport.sent == [
+        Notification(f'token-{n}', 'title', 'body')
+        for n in range(expected_sent)
+    ]
+    assert session.scalars(select(NotificationOutbox)).all() == []
+
+
+def test_relay_outbox_keeps_failed_for_retry(session):
+    enqueue_notification(session, 'token', 'title', 'body')
+    session.commit()
+
+    assert relay_outbox(session, FakeTransport(failures=1)) == 0
+
+    row = session.scalar(select(NotificationOutbox))
+    assert row.attempts == 1
+    # o próximo envio só acontece depois do backoff
+    assert relay_outbox(session, FakeTransport()) == 0
+
+
+def test_relay_outbox_drops_after_last_attempt(session, caplog):
+    enqueue_notification(session, 'token-0', 'title', 'body')
+    enqueue_notification(session, 'token-1', 'title', 'body')
+    session.execute(
+        update(NotificationOutbox)
+        .where(NotificationOutbox.token == 'token-0')
+        .values(attempts=MAX_ATTEMPTS - 1)
+    )
+    session.commit()
+
+    # só a primeira do lote falha, e era a última tentativa dela
+    with caplog.at_level(logging.WARNING):
+        relayed = relay_outbox(
+            session, FakeTransport(failures=1), batch_size=1
+        )
+
+    assert relayed == 1
+    assert session.scalars(select(NotificationOutbox)).all() == []
+    assert (
+        f'1 notificações descartadas após {MAX_ATTEMPTS} tentativas'
+        in caplog.text
+    )
@@ -0,0 +1,87 @@
+from datetime import date
+
+from sqlalchemy import select
+
+from debt_control.models import Debt, DebtInstallment, DebtState, JobWatermark
+from debt_control.services.overdue_service import (
+    OVERDUE_JOB,
+    run_overdue_transition,
+)
+
+
+def _create_debt(session, user, category, duedates):
+    debt = Debt(
+        description='Test debt',
+        value=10.0 * len(duedates),
+        plots=len(duedates),
+        purchasedate=duedates[0],
+        state=DebtState.pending,
+        note=None,
+        user_id=user.id,
+        category_id=category.id,
+    )
+    session.add(debt)
+    session.flush()
+
+    for number, duedate in enumerate(duedates, start=1):
+        session.add(
+            DebtInstallment(
+                debt_id=debt.id,
+                installmentamount=10.0,
+                number=number,
+                duedate=duedate,
+                amount=None,
+                paid_date=None,
+                state=DebtState.pending,
+                user_id=user.id,
+            )
+        )
+
+    session.commit()
+    return debt
+
+
+def test_run_overdue_transition(session, user, category):
+    debt = _create_debt(
+        session, user, category, [date(2025, 1, 10), date(2025, 2, 10)]
+    )
+
+    assert run_overdue_transition(session, today=date(2025, 1, 11)) == 1
+
+    states = session.scalars(
+        select(DebtInstallment.state).order_by(DebtInstallment.number)
+    ).all()
+    session.refresh(debt)
+
+    assert states == [DebtState.overdue, DebtState.pending]
+    assert debt.state == DebtState.overdue
+    watermark = session.get(JobWatermark, OVERDUE_JOB)
+    assert watermark.last_run == date(2025, 1, 11)
+
+
+def test_run_overdue_transition_same_day_is_noop(session, user, category):
+    _create_debt(session, user, category, [date(2025, 1, 10)])
+
+    run_overdue_transition(session, today=date(2025, 1, 11))
+
+    assert run_overdue_transition(session, today=date(2025, 1, 11)) == 0
+
+
+def test_run_overdue_transition_only_touches_crossed_rows(
+    session, user, category
+):
+    run_overdue_transition(session, today=date(2025, 1, 11))
+
+    # abaixo da marca d'água: já foi processada em execuções anteriores
+    _create_debt(session, user, category, [date(2025, 1, 5)])
+    crossed = _create_debt(session, user, category, [date(2025, 1, 20)])
+
+    assert run_overdue_transition(session, today=date(2025, 1, 21)) == 1
+
+    overdue = session.scalars(
+        select(DebtInstallment.debt_id).where(
+            DebtInstallment.state == DebtState.overdue
+        )
+    ).all()
+
+    assert overdue == [crossed.id]
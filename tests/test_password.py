@@ -0,0 +1,52 @@
+import asyncio
+import time
+from http import HTTPStatus
+
+import pytest
+
+from debt_control.security import hashing_pool
+from debt_control.utils.password import (
+    HashingPool,
+    PoolOverloaded,
+    get_password_hash,
+    verify_password,
+)
+
+
+def test_hashing_pool_runs_in_worker_process():
+    pool = HashingPool(workers=1, queue_size=0)
+    hashed = asyncio.run(pool.run(get_password_hash, 'secret'))
+    pool.shutdown()
+
+    assert verify_password('secret', hashed)
+
+
+def test_hashing_pool_rejects_when_full():
+    pool = HashingPool(workers=1, queue_size=1)
+
+    async def run():
+        busy = [asyncio.ensure_future(pool.run(time.sleep, 0.5)) for _ in '12']
+        await asyncio.sleep(0)
+        with pytest.raises(PoolOverloaded):
+            await pool.run(time.sleep, 0)
+        await asyncio.gather(*busy)
+        # com a fila liberada volta a aceitar
+        await pool.run(time.sleep, 0)
+
+    asyncio.run(run())
+    pool.shutdown()
+
+
+def test_login_returns_503_when_hashing_pool_is_full(
+    client, user, monkeypatch
+):
+    monkeypatch.setattr(hashing_pool, 'workers', 0)
+    monkeypatch.setattr(hashing_pool, 'queue_size', 0)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
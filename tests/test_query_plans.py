@@ -0,0 +1,146 @@
+from datetime import date, datetime
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import event, select, text, update
+
+from debt_control.models import Category, Debt, DebtInstallment, DebtState
+from debt_control.services.overdue_service import run_overdue_transition
+
+
+def _full_scans(node):
+    # com enable_seqscan desligado o planner prefere varrer um índice
+    # inteiro, então um Index Scan sem condição também conta como full scan
+    scans = []
+    if node['Node Type'] == 'Seq Scan' or (
+        node['Node Type'] in {'Index Scan', 'Index Only Scan'}
+        and 'Index Cond' not in node
+    ):
+        scans.append(node['Relation Name'])
+
+    for child in node.get('Plans', []):
+        scans += _full_scans(child)
+    return scans
+
+
+@pytest.fixture
+def capture_statements(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        # INSERT só quando lê de outra tabela (INSERT ... SELECT)
+        sql = statement.lstrip().upper()
+        if sql.startswith(('SELECT', 'UPDATE', 'DELETE', 'WITH')) or (
+            sql.startswith('INSERT') and 'SELECT' in sql
+        ):
+            statements.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    yield statements
+
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def other_categories(session, other_user):
+    session.add_all([
+        Category(description=f'Category {number}', user_id=other_user.id)
+        for number in range(200)
+    ])
+    session.commit()
+
+
+@pytest.fixture
+def seeded(session, debts):
+    # dívidas antigas: o job só revisita as criadas desde a última rodada
+    session.execute(update(Debt).values(created_at=datetime(2024, 1, 1)))
+    run_overdue_transition(session, today=date(2025, 6, 1))
+
+
+@pytest.mark.usefixtures('other_categories')
+@pytest.mark.parametrize(
+    'debts',
+    [
+        {
+            'months': 12,
+            'value': 1200,
+            'plots': 12,
+            'purchasedate': lambda month: date(2025, month, 1),
+            'paidinstallments': lambda month: month % 3,
+        }
+    ],
+    indirect=True,
+)
+def test_router_queries_use_indexes(
+    session, client, token, seeded, capture_statements
+):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    page = client.get('/debt/?limit=5&description=Debt', headers=headers)
+    client.get(
+        f'/debt/?limit=5&cursor={page.json()["next_cursor"]}',
+        headers=headers,
+    )
+    client.get('/debt/1/installments', headers=headers)
+    plot_ids = session.scalars(
+        select(DebtInstallment.id)
+        .where(
+            DebtInstallment.debt_id == 1,
+            DebtInstallment.state != DebtState.pay,
+        )
+        .limit(2)
+    ).all()
+    writes = [
+        client.patch(
+            '/debt/1',
+            headers=headers,
+            json={'plot_ids': plot_ids, 'amount': None},
+        ),
+        client.post(
+            '/debt/installments/pay',
+            headers=headers,
+            json={'start_date': '2025-08-01', 'end_date': '2025-08-31'},
+        ),
+        client.delete('/debt/2', headers=headers),
+    ]
+    client.get(
+        '/debt/dashboard/?start_date=2025-01-01&end_date=2025-12-31',
+        headers=headers,
+    )
+    client.get(
+        '/debt/dashboard/series/?start_date=2025-01-10&end_date=2025-11-20',
+        headers=headers,
+    )
+    client.get(
+        '/debt/dashboard/series/?start_date=2025-01-01&end_date=2025-12-31'
+        '&interval=week',
+        headers=headers,
+    )
+    client.get('/debt/export?state=pending', headers=headers)
+    client.get('/category/', headers=headers)
+    client.get('/category/?description=cat&rank=true', headers=headers)
+    client.get(
+        '/category/summary?start_date=2025-01-01&end_date=2025-03-31',
+        headers=headers,
+    )
+    run_overdue_transition(session, today=date(2025, 7, 1))
+
+    assert all(write.status_code == HTTPStatus.OK for write in writes)
+
+    session.execute(text('ANALYZE'))
+    session.execute(text('SET LOCAL enable_seqscan = off'))
+    # com tabelas tão pequenas o hash join sobre a tabela inteira sai mais
+    # barato; em produção a junção com poucas linhas vai pela chave
+    session.execute(text('SET LOCAL enable_hashjoin = off'))
+    session.execute(text('SET LOCAL enable_mergejoin = off'))
+    connection = session.connection()
+
+    for statement, parameters in capture_statements:
+        # executemany: o plano é o mesmo para todas as linhas
+        many = isinstance(parameters, (list, tuple))
+        [plan] = connection.exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {statement}',
+            parameters[0] if many else parameters,
+        ).scalar()
+        assert not _full_scans(plan['Plan']), statement
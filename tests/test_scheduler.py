@@ -0,0 +1,38 @@
+from sqlalchemy import func, select
+
+from debt_control.services.scheduler import (
+    acquire_leadership,
+    release_leadership,
+    still_leader,
+)
+
+
+def test_acquire_leadership_is_exclusive(engine):
+    leader = acquire_leadership(engine)
+
+    assert leader
+    assert acquire_leadership(engine) is None
+
+    release_leadership(leader)
+    follower = acquire_leadership(engine)
+
+    assert follower
+    release_leadership(follower)
+
+
+def test_leader_notices_lost_connection(engine):
+    leader = acquire_leadership(engine)
+    pid = leader.scalar(select(func.pg_backend_pid()))
+    leader.commit()
+
+    assert still_leader(leader)
+
+    with engine.connect() as admin:
+        admin.scalar(select(func.pg_terminate_backend(pid)))
+
+    assert not still_leader(leader)
+    release_leadership(leader)
+
+    follower = acquire_leadership(engine)
+    assert follower
+    release_leadership(follower)
@@ -2,7 +2,11 @@ from http import HTTPStatus
 
 from jwt import decode
 
-from debt_control.security import create_access_token, settings
+from debt_control.security import (
+    create_access_token,
+    create_user_token,
+    settings,
+)
 
 
 def test_jwt():
@@ -24,3 +28,14 @@ def test_jwt_invalid_token(client):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_user_token_carries_id_and_version(user):
+    token = create_user_token(user)
+
+    decoded = decode(
+        token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+    )
+
+    assert decoded['uid'] == user.id
+    assert decoded['ver'] == user.token_version
@@ -0,0 +1,126 @@
+from datetime import date
+from decimal import Decimal
+from http import HTTPStatus
+
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql
+
+from debt_control.models import (
+    DebtInstallment,
+    DebtState,
+    UserMonthlySummary,
+)
+from debt_control.services.overdue_service import run_overdue_transition
+from debt_control.services.summary_service import (
+    SummaryChanges,
+    rebuild_summary,
+)
+
+
+def _summary(session):
+    session.expire_all()
+    rows = session.scalars(
+        select(UserMonthlySummary).where(UserMonthlySummary.count != 0)
+    ).all()
+    return {
+        (row.user_id, row.month, row.state): (row.count, round(row.total, 2))
+        for row in rows
+    }
+
+
+def test_summary_matches_rebuild_after_writes(
+    session, client, user, token, debts
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    plot_id = session.scalar(
+        select(DebtInstallment.id).where(
+            DebtInstallment.debt_id == debts[0],
+            DebtInstallment.number == 1,
+        )
+    )
+    response = client.patch(
+        f'/debt/{debts[0]}',
+        headers=headers,
+        json={'plot_ids': [plot_id], 'amount': None},
+    )
+    client.delete(f'/debt/{debts[1]}', headers=headers)
+    run_overdue_transition(session, today=date(2025, 6, 1))
+
+    incremental = _summary(session)
+    rebuild_summary(session)
+
+    assert response.status_code == HTTPStatus.OK
+    # janeiro só tem a primeira parcela da primeira dívida, agora paga
+    assert incremental[user.id, date(2025, 1, 1), DebtState.pay] == (
+        1,
+        Decimal('33.34'),
+    )
+    assert incremental == _summary(session)
+
+
+def test_summary_is_cleared_when_category_is_deleted(
+    session, client, token, category, debts
+):
+    client.delete(
+        f'/category/{category.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert _summary(session) == {}
+
+
+@pytest.mark.parametrize(
+    ('start_date', 'end_date'),
+    [
+        (date(2025, 1, 1), date(2025, 12, 31)),
+        (date(2025, 2, 10), date(2025, 4, 20)),
+        (date(2025, 2, 10), date(2025, 2, 20)),
+        (date(2025, 3, 1), date(2025, 3, 14)),
+    ],
+)
+@pytest.mark.usefixtures('debts')
+def test_dashboard_from_summary_matches_installments(
+    session, client, token, start_date, end_date
+):
+    response = client.get(
+        f'/debt/dashboard/?start_date={start_date}&end_date={end_date}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    expected = session.scalar(
+        select(func.count()).where(
+            DebtInstallment.duedate.between(start_date, end_date)
+        )
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['total_debt'] == expected
+
+
+class _RecordingSession:
+    def execute(self, statement):
+        self.statement = statement
+
+
+def test_summary_changes_are_written_in_lock_order():
+    changes = SummaryChanges()
+    changes.add(2, date(2025, 1, 10), DebtState.pending, Decimal(10))
+    changes.add(1, date(2025, 2, 10), DebtState.overdue, Decimal(10))
+    changes.add(1, date(2025, 2, 10), DebtState.pay, Decimal(10))
+    changes.add(1, date(2025, 1, 10), DebtState.pending, Decimal(10))
+    session = _RecordingSession()
+
+    changes.apply(session)
+
+    params = session.statement.compile(dialect=postgresql.dialect()).params
+    # mesma ordem de um ORDER BY user_id, month, state no Postgres
+    expected_keys = [
+        (1, date(2025, 1, 1), DebtState.pending),
+        (1, date(2025, 2, 1), DebtState.pay),
+        (1, date(2025, 2, 1), DebtState.overdue),
+        (2, date(2025, 1, 1), DebtState.pending),
+    ]
+    assert [
+        (params[f'user_id_m{n}'], params[f'month_m{n}'], params[f'state_m{n}'])
+        for n in range(len(expected_keys))
+    ] == expected_keys
@@ -1,6 +1,7 @@
 from http import HTTPStatus
 
 from debt_control.schemas import UserPublic
+from debt_control.services.user_cache import user_cache
 
 
 def test_create_user(client):
@@ -148,3 +149,61 @@ def test_read_user_should_return_not_found(client):
 
     assert response.status_code == HTTPStatus.NOT_FOUND
     assert response.json() == {'detail': 'User not found'}
+
+
+def test_current_user_is_cached(client, user, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/category/', headers=headers)
+
+    with count_queries() as statements:
+        client.get('/category/', headers=headers)
+
+    assert not any('FROM users' in statement for statement in statements)
+
+
+def test_update_fcm_token_invalidates_cached_user(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/category/', headers=headers)
+    assert user_cache.get(user.id).fcm_token is None
+
+    client.patch(
+        f'/users/{user.id}', headers=headers, json={'fcm_token': 'new'}
+    )
+    response = client.post('/auth/refresh_token', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert user_cache.get(user.id).fcm_token == 'new'
+
+
+def test_delete_user_invalidates_cached_user(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.get('/category/', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_update_user_revokes_previous_tokens(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'bob',
+            'email': 'bob@example.com',
+            'password': 'mynewpassword',
+        },
+    )
+
+    response = client.get('/category/', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+    new_token = client.post(
+        '/auth/token',
+        data={'username': 'bob@example.com', 'password': 'mynewpassword'},
+    ).json()['access_token']
+    response = client.get(
+        '/category/', headers={'Authorization': f'Bearer {new_token}'}
+    )
+    assert response.status_code == HTTPStatus.OK